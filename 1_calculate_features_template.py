@@ -1,7 +1,8 @@
-from pflacco.sampling import create_initial_sample
+from pflacco.sampling import create_initial_sample, evaluate_sample
 from pflacco.classical_ela_features import *
 from pflacco.local_optima_network_features import *
 from pflacco.misc_features import * 
+from pflacco.pflacco_utils import CellGrid, LandscapeContext, LocalSearchStore
 
 import cocoex
 import os
@@ -14,6 +15,7 @@ REPITIONS = 10
 BLOCKS = 3
 SAMPLE_SIZE_FACTOR = 50
 EXP_FOLDER = './pflacco_experiment/'
+CHECKPOINT_FOLDER = './pflacco_checkpoints/'
 
 def calculate_features(problem_ids):
     suite = cocoex.Suite("bbob", f"instances:{problem_ids[2]}", f"function_indices:{problem_ids[0]} dimensions:{problem_ids[1]}")
@@ -25,45 +27,53 @@ def calculate_features(problem_ids):
         dim = f.dimension
         
         results = []
+        lon_checkpoints = []
+        os.makedirs(CHECKPOINT_FOLDER, exist_ok = True)
         for rep in range(REPITIONS):
             # Set seeds, this ensures, that at least for every (fid,dim,iid) the seeds are different over all x repetitions
             np.random.seed(int(fid) * int(iid) * int(dim) *(rep + 1))
             random.seed(int(fid) * int(iid) * int(dim) * (rep + 1))
 
             X = create_initial_sample(dim, sample_coefficient = SAMPLE_SIZE_FACTOR, lower_bound = L_BOUND, upper_bound = U_BOUND, sample_type = 'lhs')
-            y = X.apply(lambda x: f(x.values), axis = 1)
+            y = evaluate_sample(f, X)
 
             meta = calculate_ela_meta(X, y)
             pca = calculate_pca(X, y)
-            nbc = calculate_nbc(X, y)
-            disp = calculate_dispersion(X, y)
-            ic = calculate_information_content(X, y)
+            landscape_context = LandscapeContext(X, y)
+            nbc = calculate_nbc(X, y, landscape_context = landscape_context)
+            disp = calculate_dispersion(X, y, landscape_context = landscape_context)
+            ic = calculate_information_content(X, y, landscape_context = landscape_context)
             distr = calculate_ela_distribution(X, y)
-            #limo = calculate_limo(X, y, L_BOUND, U_BOUND, blocks = BLOCKS)
-            cm_angle = calculate_cm_angle(X, y, L_BOUND, U_BOUND, blocks = BLOCKS)
-            cm_conv = calculate_cm_conv(X, y, L_BOUND, U_BOUND, blocks = BLOCKS)
-            cm_grad = calculate_cm_grad(X, y, L_BOUND, U_BOUND, blocks = BLOCKS)
+            cell_grid = CellGrid(X, L_BOUND, U_BOUND, blocks = BLOCKS)
+            limo = calculate_limo(X, y, L_BOUND, U_BOUND, cell_grid = cell_grid)
+            cm_angle = calculate_cm_angle(X, y, L_BOUND, U_BOUND, cell_grid = cell_grid)
+            cm_conv = calculate_cm_conv(X, y, L_BOUND, U_BOUND, cell_grid = cell_grid, landscape_context = landscape_context)
+            cm_grad = calculate_cm_grad(X, y, L_BOUND, U_BOUND, cell_grid = cell_grid)
             ela_conv = calculate_ela_conv(X, y, f)
             ela_level = calculate_ela_level(X, y)
             ela_curvate = calculate_ela_curvate(X, y, f, dim, L_BOUND, U_BOUND)
-            ela_local = calculate_ela_local(X, y, f, dim, L_BOUND, U_BOUND)
+            local_search_store = LocalSearchStore()
+            ela_local = calculate_ela_local(X, y, f, dim, L_BOUND, U_BOUND, local_search_store = local_search_store)
 
-            fdc = calculate_fitness_distance_correlation(X, y)
+            fdc = calculate_fitness_distance_correlation(X, y, landscape_context = landscape_context)
 
+            # The LON is checkpointed, such that a job which exceeds its time limit continues where it stopped when it is resubmitted
+            lon_checkpoint = os.path.join(CHECKPOINT_FOLDER, f'F{fid}_D{dim}_I{iid}_SSize{SAMPLE_SIZE_FACTOR}_R{rep}_lon.npz')
+            lon_checkpoints.append(lon_checkpoint)
             if SAMPLE_SIZE_FACTOR == 500:
-                lon = compute_lon(f, dim, L_BOUND, U_BOUND, basin_hopping_iteration = 100, stopping_threshold = 1000)
-                hc = calculate_hill_climbing(f, dim, L_BOUND, U_BOUND, n_runs = 200, budget_factor_per_run = 80)
+                lon = compute_lon(f, dim, L_BOUND, U_BOUND, basin_hopping_iteration = 100, stopping_threshold = 1000, checkpoint_file = lon_checkpoint, local_search_store = local_search_store)
+                hc = calculate_hill_climbing(f, dim, L_BOUND, U_BOUND, n_runs = 200, budget_factor_per_run = 80, local_search_store = local_search_store)
                 grad = calculate_gradient(f, dim, L_BOUND, U_BOUND, budget_per_random_walk = 1000)
                 si = calculate_sobol_indices(f, dim, L_BOUND, U_BOUND)
                 ls = calculate_length_scales(f, dim, L_BOUND, U_BOUND, budget_factor_per_dim=100)
             else:
-                lon = compute_lon(f, dim, L_BOUND, U_BOUND, basin_hopping_iteration = 50, stopping_threshold = 1000)
-                hc = calculate_hill_climbing(f, dim, L_BOUND, U_BOUND, n_runs = 50, budget_factor_per_run = 50)
+                lon = compute_lon(f, dim, L_BOUND, U_BOUND, basin_hopping_iteration = 50, stopping_threshold = 1000, checkpoint_file = lon_checkpoint, local_search_store = local_search_store)
+                hc = calculate_hill_climbing(f, dim, L_BOUND, U_BOUND, n_runs = 50, budget_factor_per_run = 50, local_search_store = local_search_store)
                 grad = calculate_gradient(f, dim, L_BOUND, U_BOUND, budget_per_random_walk = 50)
                 si = calculate_sobol_indices(f, dim, L_BOUND, U_BOUND, sampling_coefficient = 50)
                 ls = calculate_length_scales(f, dim, L_BOUND, U_BOUND, budget_factor_per_dim = 50)
 
-            res = {**hc, **grad, **fdc, **meta, **pca, **nbc, **disp, **ic, **distr, **cm_angle, **cm_conv, **cm_grad, **ela_conv, **ela_level, **ela_curvate, **ela_local, **ls, **si, **lon}
+            res = {**hc, **grad, **fdc, **meta, **pca, **nbc, **disp, **ic, **distr, **limo, **cm_angle, **cm_conv, **cm_grad, **ela_conv, **ela_level, **ela_curvate, **ela_local, **ls, **si, **lon}
             res['fid'] = fid
             res['dim'] = dim
             res['iid'] = iid
@@ -74,6 +84,11 @@ def calculate_features(problem_ids):
         df = pd.DataFrame(results)
         df.to_csv(os.path.join(EXP_FOLDER, f'F{fid}_D{dim}_I{iid}_SSize{SAMPLE_SIZE_FACTOR}_features.csv'), index = False)
 
+        # The checkpoints are only needed until the results of the problem are written
+        for lon_checkpoint in lon_checkpoints:
+            if os.path.exists(lon_checkpoint):
+                os.remove(lon_checkpoint)
+
 
 if __name__ == '__main__':
     if len(sys.argv) == 4:
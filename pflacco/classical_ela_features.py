@@ -1,104 +1,468 @@
+import itertools
 import math
 import numpy as np
-import pandas as pd
 import time
 
 from datetime import timedelta
 from functools import partial
-from numdifftools.core import Gradient, Hessian
-
-from sklearn import linear_model
 from sklearn.decomposition import PCA
 from sklearn.discriminant_analysis import LinearDiscriminantAnalysis, QuadraticDiscriminantAnalysis
 from sklearn.neighbors import NearestNeighbors 
 from sklearn.model_selection import StratifiedKFold
 
-from scipy.spatial.distance import pdist, squareform
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import cdist
+from scipy.linalg import solve_triangular
 from scipy.stats import gaussian_kde
-from scipy.optimize import minimize as scipy_minimize
-from scipy.cluster.hierarchy import linkage, cut_tree, _order_cluster_tree
-
-from .pflacco_utils import _determine_max_n_blocks, _create_blocks, _validate_variable_types, _transform_bounds_to_canonical, _check_blocks_variable, _cartesian_product_efficient
+from scipy.cluster.hierarchy import linkage, cut_tree
+
+from .pflacco_utils import _determine_max_n_blocks, _validate_variable_types, _transform_bounds_to_canonical, _create_batch_function, _create_scalar_function, _check_cell_grid, _check_landscape_context, _minimum_spanning_tree, _single_linkage_clusters, _negate_function, _check_backend, _run_stored_local_searches, _check_local_search_store, LocalSearchStore
+
+
+# Richardson extrapolation along axis 1 of second order approximations computed with step sizes decreasing by the factor v
+def _richardson_extrapolation(approx, v):
+      approx = approx.copy()
+      r = approx.shape[1]
+      for m in range(1, r):
+            factor = float(v) ** (2 * m)
+            approx[:, :r - m] = (approx[:, 1:r - m + 1] * factor - approx[:, :r - m]) / (factor - 1)
+      return approx[:, 0]
+
+# Gradients and Hessians of f at all points in X by central differences with Richardson extrapolation (the method of numDeriv's genD).
+# The initial step is h0 = |delta * x| + eps * (|x| < zero_tol) and it is reduced r - 1 times by the factor v. The axis stencil points are
+# shared by the gradient and the diagonal of the Hessian. The stencils of up to chunk_size points are evaluated in a single call of batch_f,
+# each point requires exactly 1 + 2 * r * d + r * d * (d - 1) function evaluations.
+def _calculate_derivatives(batch_f, X, delta, eps, zero_tol, r, v, chunk_size = None):
+      n, dim = X.shape
+      first, second = np.tril_indices(dim, k = -1)
+      n_stencil = 1 + 2 * r * dim + r * dim * (dim - 1)
+      if chunk_size is None:
+            chunk_size = max(1, 2 ** 20 // (n_stencil * dim))
+      unit = np.identity(dim)
+
+      grad = np.empty((n, dim))
+      hess = np.empty((n, dim, dim))
+      for start in range(0, n, chunk_size):
+            x = X[start:start + chunk_size]
+            c = x.shape[0]
+            h0 = np.abs(delta * x) + eps * (np.abs(x) < zero_tol)
+            # Steps of shape (points, r, dim)
+            h = h0[:, None, :] / (float(v) ** np.arange(r))[None, :, None]
+            axis_step = h[:, :, :, None] * unit
+            pair_step = axis_step[:, :, first] + axis_step[:, :, second]
+            stencil = np.concatenate([
+                  x[:, None, :],
+                  (x[:, None, None, :] + axis_step).reshape(c, -1, dim),
+                  (x[:, None, None, :] - axis_step).reshape(c, -1, dim),
+                  (x[:, None, None, :] + pair_step).reshape(c, -1, dim),
+                  (x[:, None, None, :] - pair_step).reshape(c, -1, dim)], axis = 1)
+            fvals = batch_f(stencil.reshape(-1, dim)).reshape(c, n_stencil)
+
+            n_axis = r * dim
+            n_pair = r * len(first)
+            f0 = fvals[:, [0]].reshape(c, 1, 1)
+            f_plus = fvals[:, 1:1 + n_axis].reshape(c, r, dim)
+            f_minus = fvals[:, 1 + n_axis:1 + 2 * n_axis].reshape(c, r, dim)
+            grad[start:start + c] = _richardson_extrapolation((f_plus - f_minus) / (2 * h), v)
+            hess_diag = _richardson_extrapolation((f_plus - 2 * f0 + f_minus) / h ** 2, v)
+
+            f_plus = fvals[:, 1 + 2 * n_axis:1 + 2 * n_axis + n_pair].reshape(c, r, len(first))
+            f_minus = fvals[:, 1 + 2 * n_axis + n_pair:].reshape(c, r, len(first))
+            h_i = h[:, :, first]
+            h_j = h[:, :, second]
+            hess_off = _richardson_extrapolation((f_plus - 2 * f0 + f_minus - hess_diag[:, None, first] * h_i ** 2 - hess_diag[:, None, second] * h_j ** 2) / (2 * h_i * h_j), v)
+
+            hess[start:start + c, np.arange(dim), np.arange(dim)] = hess_diag
+            hess[start:start + c, first, second] = hess_off
+            hess[start:start + c, second, first] = hess_off
+
+      return grad, hess, n * n_stencil
+
+# Classifies each triple of y values [predecessor, center, successor] and returns the share of
+# 0. convex.hard, 1. concave.hard, 2. convex.soft, 3. concave.soft triples
+def _count_convexity(yvals):
+      if len(yvals) == 0:
+            return np.zeros(4)
+      ends_mean = yvals[:, [0, 2]].mean(axis = 1)
+      concave_soft = yvals[:, 1] > ends_mean
+      convex_soft = yvals[:, 1] < ends_mean
+      concave_hard = concave_soft & (yvals[:, 1] > yvals[:, [0, 2]].max(axis = 1))
+      convex_hard = convex_soft & (yvals[:, 1] < yvals[:, [0, 2]].min(axis = 1))
+
+      return np.column_stack([convex_hard, concave_hard, convex_soft, concave_soft]).mean(axis = 0)
+
+# Nearest better neighbour (id and distance) of each observation; an id of -1 denotes that there is none.
+# The first (strictly) better observation among the fast_k nearest neighbours is used if it exists. Otherwise, the nearest better
+# observation among all observations is looked up: all observations are inserted in the order of their fitness into a logarithmic
+# set of KD-trees, one per dyadic block of the fitness ranking, such that all better observations are covered by O(log n) trees.
+# Ties in the distance are broken by sampling. Observations without any better one are assigned to their nearest observation with the
+# same fitness outside of the fast_k nearest neighbours.
+def _find_nearest_better(X, y, distances, indices, dist_tie_breaker = 'sample'):
+      n = X.shape[0]
+      nb_id = np.full(n, -1)
+      nb_dist = np.full(n, np.nan)
+
+      better = y[indices[:, 1:]] < y.reshape(-1, 1)
+      first_better = better.argmax(axis = 1) + 1
+      rows = np.where(better.any(axis = 1))[0]
+      nb_id[rows] = indices[rows, first_better[rows]]
+      nb_dist[rows] = distances[rows, first_better[rows]]
+
+      fitness_order = np.argsort(y, kind = 'stable')
+      trees = {}
+      for idx in np.where(~better.any(axis = 1))[0]:
+            n_better = np.searchsorted(y[fitness_order], y[idx], side = 'left')
+            if n_better > 0:
+                  # Decompose the n_better best observations into aligned blocks of decreasing powers of two
+                  blocks = []
+                  start = 0
+                  while start < n_better:
+                        size = 1 << (int(n_better - start).bit_length() - 1)
+                        if (start, size) not in trees:
+                              trees[(start, size)] = cKDTree(X[fitness_order[start:start + size]])
+                        blocks.append((start, size))
+                        start += size
+                  min_dist = min([trees[block].query(X[idx])[0] for block in blocks])
+                  # Collect all observations (almost) as near as the nearest one, such that exact ties can be broken below
+                  candidates = []
+                  for block in blocks:
+                        in_range = trees[block].query_ball_point(X[idx], r = min_dist * (1 + 1e-9))
+                        candidates.extend(fitness_order[block[0] + np.array(in_range, dtype = 'int64')])
+                  candidates = np.array(candidates)
+            else:
+                  candidates = np.where(y == y[idx])[0]
+                  candidates = candidates[~np.isin(candidates, indices[idx, 1:]) & (candidates != idx)]
+                  if len(candidates) == 0:
+                        continue
+                  n_better = len(candidates)
 
+            candidates = np.sort(candidates)
+            d = np.sqrt(((X[candidates] - X[idx]) ** 2).sum(axis = 1))
+            if n_better == 1:
+                  j = 0
+            else:
+                  j = np.random.choice(np.where(d == d.min())[0])
+            nb_id[idx] = candidates[j]
+            nb_dist[idx] = d[j]
+
+      return nb_id, nb_dist
+
+# Non-zero pairwise distances of X, computed in blocks of chunk_size rows. X has to be sorted by (ascending) levels and level_start
+# contains the index of the first observation of each level. The level of a pair of observations is the larger of both levels.
+def _iterate_distance_blocks(X, level_start, dist_method, chunk_size):
+      n = X.shape[0]
+      for start in range(0, n, chunk_size):
+            stop = min(start + chunk_size, n)
+            block = cdist(X[start:stop], X[start:], metric = dist_method)
+            # only the first (square) part of the block contains pairs (i, j) with i >= j
+            n_square = stop - start
+            upper = np.triu(np.ones((n_square, n_square), dtype = bool), k = 1)
+            for level in range(len(level_start) - 1):
+                  first = max(level_start[level], start) - start
+                  last = level_start[level + 1] - start
+                  if last <= first:
+                        continue
+                  values = np.concatenate([
+                        block[:, first:min(last, n_square)][upper[:, first:min(last, n_square)]],
+                        block[:, max(first, n_square):last].ravel()
+                  ])
+                  yield level, values[values != 0]
+
+# Mean and median of the non-zero pairwise distances between all observations with a level <= t for each t in range(n_levels).
+# The mean is computed exactly in a first sweep over all distances, which also provides the range of the distances. The median is then
+# located with histograms of median_bins bins: 'approx' interpolates within the histogram bin (the error is bounded by the bin width),
+# 'exact' additionally collects the distances within the bin(s) of the median in another sweep. Only O(n * chunk_size) memory is used.
+def _calculate_distance_mean_median(X, levels, n_levels, dist_method = 'euclidean', median_method = 'exact', median_bins = 1024, chunk_size = 256):
+      order = np.argsort(levels, kind = 'stable')
+      X = X[order]
+      level_start = np.searchsorted(levels[order], np.arange(n_levels + 1))
+      sweep = partial(_iterate_distance_blocks, X, level_start, dist_method, chunk_size)
+
+      count = np.zeros(n_levels, dtype = 'int64')
+      total = np.zeros(n_levels)
+      lower = np.full(n_levels, np.inf)
+      upper = np.full(n_levels, -np.inf)
+      for level, values in sweep():
+            if len(values) == 0:
+                  continue
+            count[level:] += len(values)
+            total[level:] += values.sum()
+            lower[level:] = np.minimum(lower[level:], values.min())
+            upper[level:] = np.maximum(upper[level:], values.max())
+
+      means = np.full(n_levels, np.nan)
+      means[count > 0] = total[count > 0] / count[count > 0]
+      medians = np.full(n_levels, np.nan)
+      ranks = np.column_stack([(count - 1) // 2, count // 2])
+      n_inside = count.copy()
+      unresolved = count > 0
+      max_collect = chunk_size * X.shape[0]
+      sweeps = 0
+      while True:
+            # all remaining distances are identical
+            identical = unresolved & (lower == upper)
+            medians[identical] = lower[identical]
+            unresolved &= ~identical
+            if not unresolved.any():
+                  break
+
+            # All distances in [lower, upper] are collected when this is feasible within the memory bounds
+            collect = (median_method == 'exact') & ((n_inside <= max_collect) | (sweeps >= 3))
+            n_below = np.zeros(n_levels, dtype = 'int64')
+            hists = np.zeros((n_levels, median_bins), dtype = 'int64')
+            collected = [[] for _ in range(n_levels)]
+            for level, values in sweep():
+                  for t in np.where(unresolved[level:])[0] + level:
+                        n_below[t] += (values < lower[t]).sum()
+                        if collect[t]:
+                              collected[t].append(values[(values >= lower[t]) & (values <= upper[t])])
+                        else:
+                              hists[t] += np.histogram(values, bins = median_bins, range = (lower[t], upper[t]))[0]
 
-def _calculate_num_derivate(f, lower_bound, upper_bound, delta, eps, zero_tol, r, v, x):
-      h0 = np.abs(delta * x) + eps * (np.abs(x) < zero_tol)
-      side = 1 * ((x - lower_bound) <= h0) - 1 * ((upper_bound - x) <= h0)
-      side = np.array([np.nan if x == 0 else x for x in side])
+            for t in np.where(unresolved)[0]:
+                  if collect[t]:
+                        values = np.sort(np.concatenate(collected[t]))
+                        medians[t] = (values[ranks[t, 0] - n_below[t]] + values[ranks[t, 1] - n_below[t]]) / 2
+                        unresolved[t] = False
+                        continue
 
-      grad = np.abs(Gradient(f, method = 'central')(x))
-      if grad.min() > 0:
-            gr_scale = grad.max()/grad.min()
-            gr_scale_norm = np.sqrt(np.sum(gr_scale) ** 2)
+                  cum = n_below[t] + np.cumsum(hists[t])
+                  bins = np.searchsorted(cum, ranks[t], side = 'right')
+                  edges = np.linspace(lower[t], upper[t], median_bins + 1)
+                  if median_method == 'approx':
+                        before = cum[bins] - hists[t, bins]
+                        medians[t] = (edges[bins] + (ranks[t] - before + 0.5) / hists[t, bins] * (edges[1] - edges[0])).mean()
+                        unresolved[t] = False
+                  else:
+                        lower[t] = edges[bins[0]]
+                        upper[t] = edges[bins[1] + 1]
+                        n_inside[t] = cum[bins[1]] - cum[bins[0]] + hists[t, bins[0]]
+            sweeps += 1
+
+      return means, medians
+
+# Removes complete duplicates (of X and y) and aggregates the y values of observations, which are only duplicated in X, by their mean.
+# Unique observations keep their order, the aggregated observations are appended in the order of their first occurrence.
+def _aggregate_duplicates(X, y):
+      _, first = np.unique(np.column_stack([X, y]), axis = 0, return_index = True)
+      first = np.sort(first)
+      X = X[first]
+      y = y[first]
+
+      _, first, inverse, counts = np.unique(X, axis = 0, return_index = True, return_inverse = True, return_counts = True)
+      inverse = inverse.reshape(-1)
+      if (counts == 1).all():
+            return X, y
+
+      y_mean = np.bincount(inverse, weights = y) / counts
+      groups = np.concatenate([np.sort(first[counts == 1]), np.sort(first[counts > 1])])
+      return X[groups], y_mean[inverse[groups]]
+
+# Greedy nearest neighbour tour through all observations starting at observation start. The next observation is the nearest unvisited one
+# among the precomputed nearest neighbours. If all of them are visited, a KD-tree on the unvisited observations is queried instead. Visited
+# observations are only marked as deleted in the KD-tree, which is rebuilt once more than half of its observations are deleted.
+def _create_nn_tour(X, distances, indices, start):
+      n = X.shape[0]
+      visited = np.zeros(n, dtype = bool)
+      permutation = np.empty(n, dtype = 'int64')
+      dists = np.empty(n - 1)
+      permutation[0] = start
+      visited[start] = True
+      tree = None
+      n_deleted = 0
+      for i in range(1, n):
+            prev = permutation[i - 1]
+            unvisited = ~visited[indices[prev]]
+            if unvisited.any():
+                  j = unvisited.argmax()
+                  current = indices[prev, j]
+                  dists[i - 1] = distances[prev, j]
+            else:
+                  if tree is None or 2 * n_deleted > len(tree_ids):
+                        tree_ids = np.where(~visited)[0]
+                        tree = cKDTree(X[tree_ids])
+                        n_deleted = 0
+                  k = 1
+                  while True:
+                        tree_dists, tree_idx = tree.query(X[prev], k = [x + 1 for x in range(min(k, len(tree_ids)))])
+                        unvisited = ~visited[tree_ids[tree_idx]]
+                        if unvisited.any():
+                              break
+                        k *= 2
+                  j = unvisited.argmax()
+                  current = tree_ids[tree_idx[j]]
+                  dists[i - 1] = tree_dists[j]
+
+            permutation[i] = current
+            visited[current] = True
+            if tree is not None:
+                  n_deleted += 1
+
+      return permutation, dists
+
+def _calculate_ic_entropy(ratio, epsilon):
+      # Symbol of ratio[i] is sign(ratio[i]) for all epsilon[k] with k < cut[i] and 0 afterwards
+      n_eps = len(epsilon)
+      n = len(ratio)
+      sign = np.sign(ratio)
+      cut = np.searchsorted(epsilon, np.abs(ratio), side = 'right')
+      cut[sign == 0] = 0
+      # Symbol codes: -1 -> 0, 0 -> 1, 1 -> 2, nan -> 3
+      code = np.where(np.isnan(sign), 3, sign + 1).astype('int64')
+
+      # Counts of the 16 symbol pairs for every epsilon via a difference array over the epsilon index
+      a_code, b_code = code[:-1], code[1:]
+      a_cut, b_cut = cut[:-1], cut[1:]
+      lo = np.minimum(a_cut, b_cut)
+      hi = np.maximum(a_cut, b_cut)
+      mid = np.where(a_cut < b_cut, 4 + b_code, 4 * a_code + 1)
+      pair_diff = np.zeros((n_eps + 1, 16), dtype = 'int64')
+      np.add.at(pair_diff, (np.zeros(n - 1, dtype = 'int64'), 4 * a_code + b_code), 1)
+      np.add.at(pair_diff, (lo, 4 * a_code + b_code), -1)
+      np.add.at(pair_diff, (lo, mid), 1)
+      np.add.at(pair_diff, (hi, mid), -1)
+      np.add.at(pair_diff, (hi, np.full(n - 1, 5)), 1)
+      pair_counts = np.cumsum(pair_diff, axis = 0)[:-1]
+      # (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0)
+      probs = pair_counts[:, [1, 2, 4, 6, 8, 9]] / (n - 1)
+      with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            H = -np.where(probs == 0, 0, probs * np.log(probs) / np.log(6)).sum(axis = 1)
+
+      # Sparse table of range maxima over cut
+      table = [cut]
+      while 2 ** len(table) <= n:
+            step = 2 ** (len(table) - 1)
+            table.append(np.maximum(table[-1][:-step], table[-1][step:]))
+
+      def range_max(start, stop):
+            # Maximum of cut[start:stop], 0 for empty ranges
+            length = np.maximum(stop - start, 1)
+            level = np.floor(np.log2(length)).astype('int64')
+            result = np.zeros(len(start), dtype = 'int64')
+            for l in np.unique(level):
+                  sel = (level == l) & (stop > start)
+                  result[sel] = np.maximum(table[l][start[sel]], table[l][stop[sel] - 2 ** l])
+            return result
 
+      # Nearest index to the left with cut >= cut[j] and nearest index to the right with cut >= cut[i]
+      idx = np.arange(n)
+      left = idx.copy()
+      right = idx + 1
+      for l in range(len(table) - 1, -1, -1):
+            step = 2 ** l
+            pos = left - step
+            sel = pos >= 0
+            sel[sel] = table[l][pos[sel]] < cut[sel]
+            left[sel] -= step
+            sel = right + step <= n
+            sel[sel] = table[l][right[sel]] < cut[sel]
+            right[sel] += step
+
+      # Two nonzero symbols are neighbours for all epsilon[k] with max(cut between them) <= k < min(their cuts)
+      first = np.concatenate([left[left > 0] - 1, idx[right < n]])
+      second = np.concatenate([idx[left > 0], right[right < n]])
+      keep = np.concatenate([np.ones((left > 0).sum(), dtype = bool), cut[right[right < n]] > cut[right < n]])
+      first, second = first[keep], second[keep]
+      changed = (code[first] != code[second]) | (code[first] == 3)
+      first, second = first[changed], second[changed]
+      lo = range_max(first + 1, second)
+      hi = np.minimum(cut[first], cut[second])
+      sel = lo < hi
+      change_diff = np.zeros(n_eps + 1, dtype = 'int64')
+      np.add.at(change_diff, lo[sel], 1)
+      np.add.at(change_diff, hi[sel], -1)
+      M = np.cumsum(change_diff)[:-1] / (n - 1)
+
+      return H, M
+
+# Pearson correlation of all pairs of values, which are both not missing
+def _nan_correlation(a, b):
+      a = np.asarray(a, dtype = 'float64')
+      b = np.asarray(b, dtype = 'float64')
+      complete = ~np.isnan(a) & ~np.isnan(b)
+      if complete.sum() < 2:
+            return np.nan
+      with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            return np.corrcoef(a[complete], b[complete])[0, 1]
+
+# Least squares fit of yc on the leading k columns of the centered design matrix A, given the QR decomposition of A with columns scaled to
+# unit length. If these columns are (numerically) linearly dependent, the minimum norm solution is computed like LinearRegression does.
+def _fit_qr_prefix(A, Q, R, norms, yc, k):
+      diag = np.abs(np.diag(R)[:k])
+      if k > len(diag) or (diag <= np.finfo(float).eps * max(A.shape)).any():
+            coef = np.linalg.lstsq(A[:, :k], yc, rcond = None)[0]
+            return coef, yc - A[:, :k] @ coef
+
+      qty = Q[:, :k].T @ yc
+      coef = solve_triangular(R[:k, :k], qty) / norms[:k]
+      return coef, yc - Q[:, :k] @ qty
+
+def _adjusted_r2(residuals, yc, n_coef):
+      rss = (residuals ** 2).sum()
+      tss = (yc ** 2).sum()
+      if tss == 0:
+            r2 = 1.0 if rss == 0 else 0.0
       else:
-            gr_scale = np.nan
-            gr_scale_norm = np.nan
-      
-      hess = Hessian(f, method = 'central')(x)
-      eig = np.abs(np.linalg.eig(hess)[0])
-      
-      if eig.min() > 0:
-            hess_cond = eig.max()/eig.min()
-      else:
-            hess_cond = np.nan
-      
-      return np.array([gr_scale_norm, gr_scale, hess_cond])
+            r2 = 1 - rss / tss
+      return 1 - (1 - r2) * (len(yc) - 1) / (len(yc) - n_coef - 1)
 
 def calculate_ela_meta(X, y):
       start_time = time.monotonic()
 
       X, y = _validate_variable_types(X, y)
 
-      # Create liner model and calculate lm features
-      model = linear_model.LinearRegression()
-      model.fit(X, y)
+      n, dim = X.shape
+      yc = y - y.mean()
+
+      # All four models are fitted on subsets of the columns of the quadratic model with interactions, i.e., X, X^2 and the products of all
+      # pairs of these columns. The columns are ordered such that the linear model and the linear model with interactions are leading
+      # blocks of a single QR decomposition. The quadratic model is derived by appending the squared terms to the linear block.
+      X_squared = np.hstack([X, X ** 2])
+      first, second = np.triu_indices(2 * dim, k = 1)
+      linear_pair = second < dim
+      A = np.hstack([X, X[:, first[linear_pair]] * X[:, second[linear_pair]], X ** 2, X_squared[:, first[~linear_pair]] * X_squared[:, second[~linear_pair]]])
+      A = A - A.mean(axis = 0)
+      norms = np.sqrt((A ** 2).sum(axis = 0))
+      norms[norms == 0] = 1
+      Q, R = np.linalg.qr(A / norms)
+      n_lin = dim
+      n_lin_interact = dim + linear_pair.sum()
 
-      lin_simple_intercept = model.intercept_
-      lin_simple_coef_min = model.coef_.min()
-      lin_simple_coef_max = model.coef_.max()
+      # Create liner model and calculate lm features
+      coef, residuals = _fit_qr_prefix(A, Q, R, norms, yc, n_lin)
+      lin_simple_intercept = y.mean() - X.mean(axis = 0) @ coef
+      lin_simple_coef_min = coef.min()
+      lin_simple_coef_max = coef.max()
       lin_simple_coef_max_by_min = lin_simple_coef_max / lin_simple_coef_min
-      lin_simple_adj_r2 = 1 - (1 - model.score(X, y)) * (len(y) - 1) / (len(y) - X.shape[1]-1)
-      
+      lin_simple_adj_r2 = _adjusted_r2(residuals, yc, n_lin)
 
       # Create linear model with interaction
-      # Create pairwise interactions
-      X_interact = X.copy()
-      for idx in range(len(X.columns)):
-            tmp_idx = idx + 1
-            while tmp_idx < len(X.columns):         
-                  X_interact[X.columns[idx] + X.columns[tmp_idx]] = X[X.columns[idx]] * X[X.columns[tmp_idx]]
-                  tmp_idx += 1
-
-      model = linear_model.LinearRegression()
-      model.fit(X_interact, y)
-      lin_w_interact_adj_r2 = 1 - (1 - model.score(X_interact, y)) * (len(y) - 1) / (len(y) - X_interact.shape[1] - 1)
-
+      _, residuals = _fit_qr_prefix(A, Q, R, norms, yc, n_lin_interact)
+      lin_w_interact_adj_r2 = _adjusted_r2(residuals, yc, n_lin_interact)
 
       # Create quadratic model and calculate qm features
-      model = linear_model.LinearRegression()
-      X_squared = pd.concat([X, X.pow(2).add_suffix('^2')], axis = 1)
-      model.fit(X_squared, y)
-      pred = model.predict(X_squared)
-
-      quad_simple_adj_r2 = 1 - (1 - model.score(X_squared, y)) * (len(y) - 1) / (len(y) - X_squared.shape[1]-1)
-
-      quad_model_con_min = np.absolute(model.coef_[int(X_squared.shape[1]/2):]).min()
-      quad_model_con_max = np.absolute(model.coef_[int(X_squared.shape[1]/2):]).max()
+      # Column update of the QR decomposition of the linear block with the (twice orthogonalized) squared terms
+      A_quad = np.hstack([A[:, :n_lin], A[:, n_lin_interact:n_lin_interact + dim]])
+      norms_quad = np.concatenate([norms[:n_lin], norms[n_lin_interact:n_lin_interact + dim]])
+      Q_lin = Q[:, :n_lin]
+      W = A_quad[:, n_lin:] / norms_quad[n_lin:]
+      R_12 = Q_lin.T @ W
+      W = W - Q_lin @ R_12
+      correction = Q_lin.T @ W
+      W = W - Q_lin @ correction
+      Q_sq, R_22 = np.linalg.qr(W)
+      Q_quad = np.hstack([Q_lin, Q_sq])
+      R_quad = np.block([[R[:n_lin, :n_lin], R_12 + correction], [np.zeros((R_22.shape[0], n_lin)), R_22]])
+      coef, residuals = _fit_qr_prefix(A_quad, Q_quad, R_quad, norms_quad, yc, 2 * dim)
+      quad_simple_adj_r2 = _adjusted_r2(residuals, yc, 2 * dim)
+
+      quad_model_con_min = np.absolute(coef[dim:]).min()
+      quad_model_con_max = np.absolute(coef[dim:]).max()
       quad_simple_cond = quad_model_con_max/quad_model_con_min
 
-      # Create linear model with interaction
-      # Create pairwise interactions
-      X_interact = X_squared.copy()
-      for idx in range(len(X_squared.columns)):
-            tmp_idx = idx + 1
-            while tmp_idx < len(X_squared.columns):         
-                  X_interact[X_squared.columns[idx] + X_squared.columns[tmp_idx]] = X_squared[X_squared.columns[idx]] * X_squared[X_squared.columns[tmp_idx]]
-                  tmp_idx += 1
-
-      model = linear_model.LinearRegression()
-      model.fit(X_interact, y)
-      quad_w_interact_adj_r2 = 1 - (1 - model.score(X_interact, y)) * (len(y) - 1) / (len(y) - X_interact.shape[1]-1)
+      # Create quadratic model with interaction
+      _, residuals = _fit_qr_prefix(A, Q, R, norms, yc, A.shape[1])
+      quad_w_interact_adj_r2 = _adjusted_r2(residuals, yc, A.shape[1])
 
       return {
             'ela_meta.lin_simple.adj_r2': lin_simple_adj_r2,
@@ -117,25 +481,25 @@ def calculate_pca(X, y, prop_cov_x = 0.9, prop_cor_x = 0.9, prop_cov_init = 0.9,
       start_time = time.monotonic()
       X, y = _validate_variable_types(X, y)
 
-      df = pd.concat([X,y], axis = 1)
+      df = np.column_stack([X, y])
       
       # cov_x
       pca = PCA(n_components=2)
       pca.fit(X)
       exp1_var_pc1_cov_x = pca.explained_variance_ratio_[0]
 
-      ev = np.sort(np.linalg.eig(X.cov())[0])[::-1]
+      ev = np.sort(np.linalg.eig(np.cov(X, rowvar = False))[0])[::-1]
       expl_var_cov_x = np.cumsum(ev) / sum(ev)
       idx_list = np.array([idx for idx, element in enumerate(expl_var_cov_x) if element >= prop_cov_x]) + 1
       expl_var_cov_x = min(idx_list) / X.shape[1]
 
       # cor_x
-      X = (X - X.mean()) / X.std()
+      X = (X - X.mean(axis = 0)) / X.std(axis = 0, ddof = 1)
       pca = PCA(n_components=2)
       pca.fit(X)
       exp1_var_pc1_cor_x = pca.explained_variance_ratio_[0]
 
-      ev = np.sort(np.linalg.eig(X.cov())[0])[::-1]
+      ev = np.sort(np.linalg.eig(np.cov(X, rowvar = False))[0])[::-1]
       expl_var_cor_x = np.cumsum(ev) / sum(ev)
       idx_list = np.array([idx for idx, element in enumerate(expl_var_cor_x) if element >= prop_cor_x]) + 1
       expl_var_cor_x = min(idx_list) / X.shape[1]
@@ -145,18 +509,18 @@ def calculate_pca(X, y, prop_cov_x = 0.9, prop_cor_x = 0.9, prop_cov_init = 0.9,
       pca.fit(df)
       exp1_var_pc1_cov_init = pca.explained_variance_ratio_[0]
 
-      ev = np.sort(np.linalg.eig(df.cov())[0])[::-1]
+      ev = np.sort(np.linalg.eig(np.cov(df, rowvar = False))[0])[::-1]
       expl_var_cov_init = np.cumsum(ev) / sum(ev)
       idx_list = np.array([idx for idx, element in enumerate(expl_var_cov_init) if element >= prop_cov_init]) + 1
       expl_var_cov_init = min(idx_list) / df.shape[1]
 
       # cor_init
-      df = (df - df.mean())/df.std()
+      df = (df - df.mean(axis = 0)) / df.std(axis = 0, ddof = 1)
       pca = PCA(n_components=2)
       pca.fit(df)
       expl_var_pc1_cor_init = pca.explained_variance_ratio_[0]
 
-      ev = np.sort(np.linalg.eig(df.cov())[0])[::-1]
+      ev = np.sort(np.linalg.eig(np.cov(df, rowvar = False))[0])[::-1]
       expl_var_cor_init = np.cumsum(ev) / sum(ev)
       idx_list = np.array([idx for idx, element in enumerate(expl_var_cor_init) if element >= prop_cor_init]) + 1
       expl_var_cor_init = min(idx_list) / df.shape[1]
@@ -174,122 +538,84 @@ def calculate_pca(X, y, prop_cov_x = 0.9, prop_cor_x = 0.9, prop_cov_init = 0.9,
           'pca.costs_runtime': timedelta(seconds=time.monotonic() - start_time).total_seconds()
       }
 
-def calculate_nbc(X, y, fast_k = 0.05, dist_tie_breaker = 'sample', minimize = True):
+def calculate_nbc(X, y, fast_k = 0.05, dist_tie_breaker = 'sample', minimize = True, landscape_context = None):
       start_time = time.monotonic()
-      X, y = _validate_variable_types(X, y)
+      landscape_context = _check_landscape_context(X, y, landscape_context)
+      X, y = landscape_context.X, landscape_context.y
 
       if fast_k < 1:
             fast_k = math.ceil(fast_k * X.shape[0])
       if fast_k < 0 or fast_k > X.shape[0]:
             raise Exception(f'[{fast_k}] of "fast_k" does not lie in the interval [0,n] where n is the number of observations.')
+      if dist_tie_breaker != 'sample':
+            #TODO welche anderen Tiebreaker methoden gibt es? es gibt noch first und last
+            raise Exception('Currently, the only available tie breaker method is "sample"')
       if minimize == False:
             y = y * -1
 
-      nbrs = NearestNeighbors(n_neighbors = fast_k, algorithm='kd_tree').fit(X)
-      distances, indices = nbrs.kneighbors(X)
-      results = []
-      for idx in range(X.shape[0]):
-            y_rec = y[idx]
-            ind_nn = indices[idx][1:]
-            y_near = y[ind_nn]
-            better = y_near < y_rec
-            if sum(better) > 0:
-                  better = better.reset_index(drop = True)
-                  b_idx = better.idxmax()
-                  results.append([idx, ind_nn[b_idx], distances[idx][b_idx + 1]])
-            else:
-                  ind_alt = np.array([x for x in range(X.shape[0]) if x not in ind_nn and x != idx])
-                  if sum(y[ind_alt] < y_rec) != 0:
-                        ind_alt = ind_alt[y[ind_alt] < y_rec] #TODO: check
-                  elif sum(y[ind_alt] == y_rec) != 0:
-                        ind_alt = ind_alt[y[ind_alt] == y_rec] #TODO: check
-                  else:
-                        results.append([idx, None, None])
-                        continue
-                  if len(ind_alt) == 1:
-                        results.append([idx, ind_alt[0], math.sqrt((X.iloc[ind_alt[0]] - X.iloc[idx]).pow(2).sum())])
-                  else:
-                        d = np.sqrt((X.iloc[ind_alt] - X.iloc[idx]).pow(2).sum(axis = 1)).reset_index(drop = True)
-                        if dist_tie_breaker == 'sample':
-                              j = np.random.choice(d[d == d.min()].index)
-                              results.append([idx, ind_alt[j], d[j]])
-                        else:
-                              #TODO welche anderen Tiebreaker methoden gibt es? es gibt noch first und last
-                              raise Exception('Currently, the only available tie breaker method is "sample"')
+      distances, indices = landscape_context.kneighbors(fast_k)
+      nb_id, nb_dist = _find_nearest_better(X, y, distances, indices, dist_tie_breaker)
 
-      nb_stats = pd.DataFrame(results, columns = ['ownID', 'nbID', 'nbDist'])
-      nb_stats['nearDist'] = [x[1] for x in distances]
-      nb_stats['nb_near_ratio'] = nb_stats['nbDist'] / nb_stats['nearDist']
-      nb_stats['fitness'] = y
-      
-      results = []
-      for own_id in nb_stats['ownID']:
-            x = nb_stats[nb_stats['nbID'] == own_id].index
-            count = len(x)
-            if count > 0:
-                  to_me_dist = nb_stats['nbDist'][x].median()
-                  results.append([count, to_me_dist, nb_stats['nbDist'][own_id]/to_me_dist])
-            else:
-                  results.append([0, None, None])
- 
-      nb_stats = pd.concat([nb_stats, pd.DataFrame(results, columns = ['toMe_count', 'toMe_dist_median', 'nb_median_toMe_ration'])], axis = 1)
-      #nb_stats['nbDist'][nb_stats['nbDist'].isna()] = nb_stats['nearDist'][nb_stats['nbDist'].isna()]
-      dist_ratio = nb_stats['nearDist'] / nb_stats['nbDist']
+      near_dist = distances[:, 1]
+
+      # Number of observations, which have the respective observation as nearest better neighbour
+      to_me_count = np.bincount(nb_id[nb_id >= 0], minlength = X.shape[0])
+      dist_ratio = near_dist / nb_dist
 
       return {
-            'nbc.nn_nb.sd_ratio': nb_stats['nearDist'].std() / nb_stats['nbDist'].std(),
-            'nbc.nn_nb.mean_ratio': nb_stats['nearDist'].mean() / nb_stats['nbDist'].mean(),
-            'nbc.nn_nb.cor': nb_stats['nearDist'].corr(nb_stats['nbDist']),
-            'nbc.dist_ratio.coeff_var': dist_ratio.std()/dist_ratio.mean(),
-            'nbc.nb_fitness.cor': nb_stats['toMe_count'].corr(nb_stats['fitness']),
+            'nbc.nn_nb.sd_ratio': np.nanstd(near_dist, ddof = 1) / np.nanstd(nb_dist, ddof = 1),
+            'nbc.nn_nb.mean_ratio': np.nanmean(near_dist) / np.nanmean(nb_dist),
+            'nbc.nn_nb.cor': _nan_correlation(near_dist, nb_dist),
+            'nbc.dist_ratio.coeff_var': np.nanstd(dist_ratio, ddof = 1) / np.nanmean(dist_ratio),
+            'nbc.nb_fitness.cor': _nan_correlation(to_me_count, y),
             'nbc.costs_runtime': timedelta(seconds=time.monotonic() - start_time).total_seconds()
       }
 
-def calculate_dispersion(X, y, disp_quantiles = [0.02, 0.05, 0.1, 0.25], dist_method = 'euclidean', dist_p = 2, minimize = True):
+def calculate_dispersion(X, y, disp_quantiles = [0.02, 0.05, 0.1, 0.25], dist_method = 'euclidean', dist_p = 2, minimize = True, disp_median_method = 'exact', disp_median_bins = 1024, disp_chunk_size = 256, landscape_context = None):
       start_time = time.monotonic()
-      X, y = _validate_variable_types(X, y)
+      landscape_context = _check_landscape_context(X, y, landscape_context)
+      X, y = landscape_context.X, landscape_context.y
+      if disp_median_method not in ['exact', 'approx']:
+            raise Exception('Only "exact" and "approx" are valid parameter values for "disp_median_method"')
 
       if minimize == False:
             y = y * -1
 
       quantiles = np.quantile(y, disp_quantiles)
-      
-      idx_in_quantiles = {}
-      for idx, quantile in enumerate(quantiles):
-            idx_in_quantiles[str(disp_quantiles[idx])] = [x for x in y[y < quantile].index]
 
-      dists = {}
+      # The subsets of observations below the quantiles are nested. Each observation is assigned to the smallest subset it is part of
+      # (or to level len(disp_quantiles) if it is only part of the full sample), such that the distances of all subsets are derived from
+      # a single sweep over the pairwise distances of the full sample.
       # Parameter p only will apply if method is 'minkowski'. Otherwise it will be ignored by scipy
-      for quantile in idx_in_quantiles:
-            idx_in_quantiles[quantile]
-            dists[quantile] = squareform(pdist(X.iloc[idx_in_quantiles[quantile]], metric = dist_method))
-
-      dist_full_sample = squareform(pdist(X, metric = dist_method))
-
-      means = []
-      medians = []
-      for key in dists:
-            means.append(np.mean(dists[key][dists[key] != 0]))
-            medians.append(np.median(dists[key][dists[key] != 0]))
+      q_order = np.argsort(quantiles, kind = 'stable')
+      levels = np.searchsorted(quantiles[q_order], y, side = 'right')
+      dist_means, dist_medians = _calculate_distance_mean_median(X, levels, len(quantiles) + 1, dist_method, disp_median_method, disp_median_bins, disp_chunk_size)
+      means = np.empty(len(quantiles))
+      medians = np.empty(len(quantiles))
+      means[q_order] = dist_means[:-1]
+      medians[q_order] = dist_medians[:-1]
+      full_mean = dist_means[-1]
+      full_median = dist_medians[-1]
 
       keys = ['disp.ratio_mean_{:0>2d}'.format(int(round(x * 100, 0))) for x in disp_quantiles]
       keys.extend(['disp.ratio_median_{:0>2d}'.format(int(round(x * 100, 0))) for x in disp_quantiles])
       keys.extend(['disp.diff_mean_{:0>2d}'.format(int(round(x * 100, 0))) for x in disp_quantiles])
       keys.extend(['disp.diff_median_{:0>2d}'.format(int(round(x * 100, 0))) for x in disp_quantiles])
 
-      values = means / np.mean(dist_full_sample[dist_full_sample != 0])
-      values = np.concatenate((values, medians / np.median(dist_full_sample[dist_full_sample != 0])), axis = None)
-      values = np.concatenate((values, means - np.mean(dist_full_sample[dist_full_sample != 0])), axis = None)
-      values = np.concatenate((values, medians - np.median(dist_full_sample[dist_full_sample != 0])), axis = None)
+      values = means / full_mean
+      values = np.concatenate((values, medians / full_median), axis = None)
+      values = np.concatenate((values, means - full_mean), axis = None)
+      values = np.concatenate((values, medians - full_median), axis = None)
 
       result = {keys[i]: values[i] for i in range(len(keys))}
       result['disp.costs_runtime'] = timedelta(seconds=time.monotonic() - start_time).total_seconds()
       return result
 
 def calculate_information_content(X, y, ic_sorting = 'nn', ic_nn_neighborhood = 20, ic_nn_start = None,\
-      ic_epsilon = np.insert(10 ** np.linspace(start = -5, stop = 15, num = 1000), 0, 0), ic_settling_sensitivity = 0.05, ic_info_sensitivity = 0.5, ic_seed = None):
+      ic_epsilon = np.insert(10 ** np.linspace(start = -5, stop = 15, num = 1000), 0, 0), ic_settling_sensitivity = 0.05, ic_info_sensitivity = 0.5, ic_seed = None, landscape_context = None):
       start_time = time.monotonic()
-      X, y = _validate_variable_types(X, y)
+      landscape_context = _check_landscape_context(X, y, landscape_context)
+      X, y = landscape_context.X, landscape_context.y
 
       n = X.shape[1]
       ic_aggregate_duplicated = 'mean'
@@ -305,108 +631,39 @@ def calculate_information_content(X, y, ic_sorting = 'nn', ic_nn_neighborhood =
             raise Exception('"ic_settling_sensitivity must be larger than zero')
       if ic_info_sensitivity < -1 or ic_info_sensitivity > 1:
             raise Exception('"ic_settling_sensitivity must be larger than zero')
-      if sum(X.duplicated()) == X.shape[0]:
+      if (X == X[0]).all():
             raise Exception('Can not IC compute information content features, because provided values are identical')
       epsilon = np.unique(ic_epsilon)
 
 
       # Duplicate check and mean aggregation for the objective variable, if only variables in the decision space are duplicated.
-      dup_index = X.duplicated(keep = False)
-      if dup_index.any():
-            complete = pd.concat([X, pd.DataFrame(y, columns = ['y'])], axis = 1).duplicated()
-            # Remove complete duplicates, because these cannot be aggregated using e.g. the mean of y
-            if complete.any():
-                  X = X[~complete]
-                  y = y[~complete]
-                  dup_index = X.duplicated(keep = False)
-            
-            # TODO Check with Pascal: the next line seems utterly pointless, a flip of the second array is missing. yes double flip.. that is why it is pointless.
-            #dup_index = np.bitwise_or(dup_index, np.array(np.flip(dup_index)))
-            Z = X[dup_index]
-            v = y[dup_index]
-            X = X[~dup_index]
-            y = y[~dup_index]
-
-            while len(v) > 1:
-                  index = np.array([(Z.iloc[0] == Z.iloc[idx]).all() for idx in range(Z.shape[0])])
-                  X = pd.concat([X, Z.iloc[[0]]], ignore_index = True)
-                  Z = Z[~index]
-                  y = pd.concat([y, pd.DataFrame([v[index].mean()])], ignore_index = True)
-                  v = v[~index]
+      X, y = _aggregate_duplicates(X, y)
 
-            
       if ic_seed is not None and isinstance(ic_seed, int):
             np.random.seed(ic_seed)
 
       # dist based on ic_sorting
       if ic_sorting == 'random':
             permutation = np.random.choice(range(X.shape[0]), size = X.shape[0], replace = False)
-            X = X.iloc[permutation].reset_index(drop = True)
-            d = [np.sqrt((X.iloc[idx] - X.iloc[idx + 1]).pow(2).sum()) for idx in range(X.shape[0] - 1)]
+            d = np.sqrt((np.diff(X[permutation], axis = 0) ** 2).sum(axis = 1))
       else:
             if ic_nn_start is None:
                   ic_nn_start = np.random.choice(range(X.shape[0]), size = 1)[0]
             if ic_nn_neighborhood < 1 and ic_nn_neighborhood > X.shape[0]:
                   raise Exception(f'[{ic_nn_neighborhood}] is an invalid option for the NN neighborhood, because the sample only covers 1 to {X.shape[0]} observations.')
-            nbrs = NearestNeighbors(n_neighbors = min(ic_nn_neighborhood, X.shape[0]), algorithm='kd_tree').fit(X)
-            distances, indices = nbrs.kneighbors(X)
-
-            current = ic_nn_start
-            candidates = np.delete(np.array([x for x in range(X.shape[0])]), current)
-            permutation = [current]
-            permutation.extend([None] * (X.shape[0] - 1))
-            dists = [None] * (X.shape[0])
-
-            for i in range(1, X.shape[0]):
-                  currents = indices[permutation[i-1]]
-                  current = np.array([x for x in currents if x in candidates])
-                  if len(current) > 0:
-                        current = current[0]
-                        permutation[i] = current
-                        candidates = candidates[candidates != current]
-                        dists[i] = distances[permutation[i - 1], currents == current][0]
-                  else:
-                        nbrs2 = NearestNeighbors(n_neighbors = min(1, X.shape[0])).fit(X.iloc[candidates])
-                        distances2, indices2, = nbrs2.kneighbors(X.iloc[permutation[i - 1]].to_numpy().reshape(1, X.shape[1]))
-                        current = candidates[np.ravel(indices2)[0]]
-                        permutation[i] = current
-                        candidates = candidates[candidates != current]
-                        dists[i] = np.ravel(distances2)[0]
-
-            d = dists[1:]
+            # The nearest neighbours of the shared sample can only be reused, if no duplicates were aggregated
+            if X.shape[0] == landscape_context.n_obs:
+                  distances, indices = landscape_context.kneighbors(ic_nn_neighborhood)
+            else:
+                  nbrs = NearestNeighbors(n_neighbors = min(ic_nn_neighborhood, X.shape[0]), algorithm='kd_tree').fit(X)
+                  distances, indices = nbrs.kneighbors(X)
+            permutation, d = _create_nn_tour(X, distances, indices, ic_nn_start)
 
-      # Calculate psi eps
-      psi_eps = []
+      # Calculate H and M for all epsilon values at once
       y_perm = y[permutation]
       diff_y = np.ediff1d(y_perm)
       ratio = diff_y/d
-      for eps in ic_epsilon:
-            psi_eps.append([0 if abs(x) < eps else np.sign(x) for x in ratio])
-
-      psi_eps = np.array(psi_eps)
-      H = []
-      M = []
-      for row in psi_eps:
-            # Calculate H values
-            a = row[:-1]
-            b = row[1:]
-            probs = []
-            probs.append(np.bitwise_and(a == -1, b == 0).mean())
-            probs.append(np.bitwise_and(a == -1, b == 1).mean())
-            probs.append(np.bitwise_and(a == 0, b == -1).mean())
-            probs.append(np.bitwise_and(a == 0, b == 1).mean())
-            probs.append(np.bitwise_and(a == 1, b == -1).mean())
-            probs.append(np.bitwise_and(a == 1, b == 0).mean())
-            H.append(-sum([0 if x == 0 else x * np.log(x)/np.log(6) for x in probs]))
-
-            # Calculate M values
-            n = len(row)
-            row = row[row != 0]
-            len_row = len(row[np.insert(np.ediff1d(row) != 0, 0, False)]) if len(row) > 0 else 0
-            M.append(len_row/ (n - 1))
-
-      H = np.array(H)
-      M = np.array(M)
+      H, M = _calculate_ic_entropy(ratio, epsilon)
       eps_s = epsilon[H < ic_settling_sensitivity]
       eps_s = np.log(eps_s.min()) / np.log(10) if len(eps_s) > 0 else None
 
@@ -440,7 +697,7 @@ def calculate_ela_distribution(X, y, ela_distr_smoothing_bandwith = 'SJ', ela_di
 
       # Calculate skewness
       y_skewness = y - y.mean()
-      y_skewness = np.sqrt(n) * (y_skewness.pow(3)).sum() / ((y_skewness.pow(2)).sum() ** (3/2))
+      y_skewness = np.sqrt(n) * (y_skewness ** 3).sum() / (((y_skewness ** 2).sum()) ** (3/2))
       if ela_distr_skewness_type == 2:
             y_skewness = y_skewness * np.sqrt(n * (n - 1))/(n - 2)
       elif ela_distr_skewness_type == 3:
@@ -448,7 +705,7 @@ def calculate_ela_distribution(X, y, ela_distr_smoothing_bandwith = 'SJ', ela_di
 
       # Calculate kurtosis
       y_kurtosis = y - y.mean()
-      r = n * (y_kurtosis.pow(4).sum()) / (y_kurtosis.pow(2).sum() ** 2)
+      r = n * ((y_kurtosis ** 4).sum()) / ((y_kurtosis ** 2).sum() ** 2)
       if ela_distr_kurtosis_type == 1:
             y_kurtosis = r - 3
       elif ela_distr_kurtosis_type == 2:
@@ -484,16 +741,48 @@ def calculate_ela_distribution(X, y, ela_distr_smoothing_bandwith = 'SJ', ela_di
             'ela_distr.costs_runtime': timedelta(seconds=time.monotonic() - start_time).total_seconds()
       }
             
-def calculate_limo(X, y, lower_bound, upper_bound, blocks = None):
+# Coefficients of the linear regression models (with intercept) of all occupied cells of the grid. The centered normal equations of all
+# cells are accumulated with segmented reductions over the cell-sorted sample and solved in one stacked call. Cells without a unique
+# (well-conditioned) solution, e.g., cells with at most dim observations, are zero-padded and solved for the minimum norm solution in one
+# stacked pinv. Singular values below sqrt(eps) of the largest one are treated as zero, such that rank deficient cells do not fit round-off.
+def _fit_cell_regressions(X, y, cell_grid):
+      dim = X.shape[1]
+      counts = cell_grid.counts
+      starts = cell_grid.offsets[:-1]
+      cell_index = np.repeat(np.arange(len(counts)), counts)
+      X_cell = X[cell_grid.order]
+      y_cell = y[cell_grid.order]
+      X_cell = X_cell - (np.add.reduceat(X_cell, starts, axis = 0) / counts.reshape(-1, 1))[cell_index]
+      y_cell = y_cell - (np.add.reduceat(y_cell, starts) / counts)[cell_index]
+
+      gram = np.add.reduceat(X_cell[:, :, None] * X_cell[:, None, :], starts, axis = 0)
+      xty = np.add.reduceat(X_cell * y_cell.reshape(-1, 1), starts, axis = 0)
+
+      coef = np.zeros((len(counts), dim))
+      solvable = counts > dim
+      solvable[solvable] = np.linalg.cond(gram[solvable]) < 1 / np.sqrt(np.finfo(float).eps)
+      if solvable.any():
+            coef[solvable] = np.linalg.solve(gram[solvable], xty[solvable].reshape(-1, dim, 1))[:, :, 0]
+
+      fallback = np.where(~solvable)[0]
+      if len(fallback) > 0:
+            rows = np.isin(cell_index, fallback)
+            slot = np.searchsorted(fallback, cell_index[rows])
+            pos = (np.arange(len(cell_index)) - starts[cell_index])[rows]
+            X_pad = np.zeros((len(fallback), counts[fallback].max(), dim))
+            y_pad = np.zeros((len(fallback), counts[fallback].max(), 1))
+            X_pad[slot, pos] = X_cell[rows]
+            y_pad[slot, pos, 0] = y_cell[rows]
+            coef[fallback] = (np.linalg.pinv(X_pad, rcond = np.sqrt(np.finfo(float).eps)) @ y_pad)[:, :, 0]
+
+      return coef
+
+def calculate_limo(X, y, lower_bound, upper_bound, blocks = None, cell_grid = None):
       start_time = time.monotonic()
       X, y = _validate_variable_types(X, y)
       dims = X.shape[1]
-      blocks = _check_blocks_variable(X, dims, blocks)
-
-      # Consolidate X, y, and cells into one data frame
-      init = X.copy()
-      init['y'] = y
-      init['cells'], _ = _create_blocks(X, y, lower_bound, upper_bound, blocks)
+      cell_grid = _check_cell_grid(X, lower_bound, upper_bound, blocks, cell_grid)
+      blocks = cell_grid.blocks
 
       result = {
             'limo.avg_length': None,
@@ -511,17 +800,10 @@ def calculate_limo(X, y, lower_bound, upper_bound, blocks = None):
       }
 
       # if the maximum number of observations in any cell is smaller or equal to the dimensionality, no features can be calculated
-      if max([init[init['cells'] == x].shape[0] for x in init['cells'].unique()]) <= dims:
+      if cell_grid.counts.max() <= dims:
             return result
 
-      coeff_vector = []
-      for cell in init['cells'].unique():
-            y_cell = init.loc[init['cells'] == cell, 'y']
-            X_cell = init.loc[init['cells'] == cell, np.logical_and(init.columns != 'cells', init.columns != 'y')]
-            model = linear_model.LinearRegression()
-            model.fit(X_cell, y_cell)
-            coeff_vector.append(model.coef_)
-      coeff_vector = np.array(coeff_vector)
+      coeff_vector = _fit_cell_regressions(X, y, cell_grid)
       
       coeff_ratio = np.array([np.max(np.abs(coeff)) / np.min(np.abs(coeff)) if ~np.isnan(coeff).all() else None for coeff in coeff_vector])
 
@@ -552,55 +834,42 @@ def calculate_limo(X, y, lower_bound, upper_bound, blocks = None):
       return result
 
 # TODO small todo inside function
-def calculate_cm_angle(X, y, lower_bound, upper_bound, blocks = None, minimize = True):
+def calculate_cm_angle(X, y, lower_bound, upper_bound, blocks = None, minimize = True, cell_grid = None):
       start_time = time.monotonic()
       X, y = _validate_variable_types(X, y)
       dim = X.shape[1]
       if blocks is None:
             blocks = _determine_max_n_blocks(X)
-      if not isinstance(blocks, list) and type(blocks) is not np.ndarray:
-            blocks = np.array([blocks] * dim)
-      elif isinstance(blocks, list):
-            blocks = np.array(blocks)
-      if len(blocks) != dim:
-            raise Exception('The provided value for "block" does not have the same length as the dimensionality of X.')
-
-      init = X.copy()
-      init['y'] = y if minimize == True else -1 * y
-      init['cell'], cell_centers = _create_blocks(X, y, lower_bound, upper_bound, blocks)
-
-      grid_best = init.loc[init.groupby('cell')['y'].idxmin()]
-      grid_worst = init.loc[init.groupby('cell')['y'].idxmax()]
-      y_global_best = grid_best['y'].min()
-      y_global_worst = grid_worst['y'].max()
-      non_empty = np.sort(grid_best['cell'].unique())
+      cell_grid = _check_cell_grid(X, lower_bound, upper_bound, blocks, cell_grid)
+      blocks = cell_grid.blocks
+
+      if minimize == False:
+            y = -1 * y
+
+      # Best and worst observation of every occupied cell (the first one in case of ties) from a sort by cell, fitness and index
+      obs_idx = np.arange(X.shape[0])
+      cell_start = cell_grid.offsets[:-1]
+      best = np.lexsort((obs_idx, y, cell_grid.cell_ids))[cell_start]
+      worst = np.lexsort((obs_idx, -y, cell_grid.cell_ids))[cell_start]
+      y_global_best = y.min()
+      y_global_worst = y.max()
+      non_empty = cell_grid.cells
       no_total = np.product(blocks)
       no_empty = no_total - len(non_empty)
       # TODO if no_total = 1
       
-      cell_values = []
-      for idx in range(len(cell_centers)):
-            x_center = cell_centers[idx]
-            x_worst = grid_worst.loc[grid_worst['cell'] == idx, X.columns]
-            x_best = grid_best.loc[grid_best['cell'] == idx, X.columns]
-            if x_worst.shape[0] == 0:
-                  cell_values.append([np.nan, np.nan, np.nan, np.nan])
-                  continue
-            y_local_worst = grid_worst.loc[grid_worst['cell'] == idx, 'y'].values[0]
-            y_local_best = grid_best.loc[grid_best['cell'] == idx, 'y'].values[0]
-            b2w_ratio = (y_local_worst - y_local_best)/(y_global_worst - y_global_best)
-            c2b_vect = (x_best - x_center).to_numpy()
-            c2b_dist = np.sqrt(np.sum(c2b_vect ** 2))
-            c2w_vect = (x_worst - x_center).to_numpy()
-            c2w_dist = np.sqrt(np.sum(c2w_vect ** 2))
-            denominator = c2b_dist * c2w_dist
-            if denominator == 0 or (x_worst.values == x_best.values).all():
-                  angle = 0
-            else:
-                  x = (c2b_vect * c2w_vect).sum()/denominator
-                  angle = np.arccos(x) * 180/np.pi
-            cell_values.append([c2b_dist, c2w_dist, angle, b2w_ratio])
-      cell_values = np.array(cell_values)
+      # Empty cells do not contribute to the aggregated cell values. Hence, only the centers of occupied cells are required.
+      x_center = cell_grid.cell_centers(cell_grid.cells)
+      b2w_ratio = (y[worst] - y[best])/(y_global_worst - y_global_best)
+      c2b_vect = X[best] - x_center
+      c2b_dist = np.sqrt(np.sum(c2b_vect ** 2, axis = 1))
+      c2w_vect = X[worst] - x_center
+      c2w_dist = np.sqrt(np.sum(c2w_vect ** 2, axis = 1))
+      denominator = c2b_dist * c2w_dist
+      coincident = (denominator == 0) | (X[worst] == X[best]).all(axis = 1)
+      with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            angle = np.where(coincident, 0, np.arccos((c2b_vect * c2w_vect).sum(axis = 1)/denominator) * 180/np.pi)
+      cell_values = np.column_stack([c2b_dist, c2w_dist, angle, b2w_ratio])
       cv_means = np.nanmean(cell_values, axis = 0)
       cv_sample_stds = np.nanstd(cell_values, axis = 0, ddof = 1)
       return {
@@ -615,128 +884,105 @@ def calculate_cm_angle(X, y, lower_bound, upper_bound, blocks = None, minimize =
             'cm_angle.costs_runtime': timedelta(seconds=time.monotonic() - start_time).total_seconds()
       }
 
-def calculate_cm_conv(X, y, lower_bound, upper_bound, blocks = None, minimize = True, cm_conv_diag = False,  cm_conv_fast_k = 0.05):
+# Representative observation of every cell in the triples nbs of the sparse cell convexity features. Occupied cells are represented by the
+# nearest observation to their center (like in the dense path). An empty cell is represented by the nearest observation to its center
+# among the observations of the occupied cells, which share a triple with it. This avoids a nearest neighbour search in the whole sample
+# for each of the (in higher dimensions very many) empty cells.
+def _find_cell_representatives(X, cell_grid, nbs, landscape_context):
+      cells, inverse = np.unique(nbs, return_inverse = True)
+      inverse = inverse.reshape(nbs.shape)
+      representatives = np.full(len(cells), -1)
+      if len(cells) == 0:
+            return representatives, inverse
+
+      positions = np.minimum(np.searchsorted(cell_grid.cells, cells), len(cell_grid.cells) - 1)
+      occupied = cell_grid.cells[positions] == cells
+      _, nearest = landscape_context.query(cell_grid.cell_centers(cells[occupied]), k = 1)
+      representatives[occupied] = nearest[:, 0]
+
+      # Pairs of an empty cell and an occupied cell of the same triple
+      pairs = []
+      for a, b in itertools.permutations(range(3), 2):
+            valid = ~occupied[inverse[:, a]] & occupied[inverse[:, b]]
+            pairs.append(np.column_stack([inverse[valid, a], positions[inverse[valid, b]]]))
+      pairs = np.unique(np.vstack(pairs), axis = 0)
+      if len(pairs) == 0:
+            return representatives, inverse
+
+      # Every pair is expanded to the observations of its occupied cell
+      counts = cell_grid.counts[pairs[:, 1]]
+      pair_idx = np.repeat(np.arange(len(pairs)), counts)
+      members = cell_grid.order[np.repeat(cell_grid.offsets[pairs[:, 1]], counts) + np.arange(len(pair_idx)) - np.repeat(np.cumsum(counts) - counts, counts)]
+      empty = pairs[pair_idx, 0]
+      empty_cells, center_idx = np.unique(empty, return_inverse = True)
+      centers = cell_grid.cell_centers(cells[empty_cells])
+      dists = np.empty(len(pair_idx))
+      chunk_size = max(1, 2 ** 20 // X.shape[1])
+      for start in range(0, len(pair_idx), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            dists[chunk] = ((centers[center_idx[chunk]] - X[members[chunk]]) ** 2).sum(axis = 1)
+
+      # Closest observation per empty cell (ties are broken by the index of the observation)
+      order = np.lexsort((members, dists, empty))
+      first = order[np.insert(empty[order][1:] != empty[order][:-1], 0, True)]
+      representatives[empty[first]] = members[first]
+
+      return representatives, inverse
+
+def calculate_cm_conv(X, y, lower_bound, upper_bound, blocks = None, minimize = True, cm_conv_diag = False,  cm_conv_fast_k = 0.05, cm_conv_sparse = False, cm_conv_max_dense_size = None, cell_grid = None, landscape_context = None):
       start_time = time.monotonic()
-      X, y = _validate_variable_types(X, y)
+      landscape_context = _check_landscape_context(X, y, landscape_context)
+      X, y = landscape_context.X, landscape_context.y
       dim = X.shape[1]
-      blocks = _check_blocks_variable(X, dim, blocks)
+      cell_grid = _check_cell_grid(X, lower_bound, upper_bound, blocks, cell_grid)
+      blocks = cell_grid.blocks
       if blocks.min() <= 2:
             raise Exception('The cell convexity features can only be computed when all dimensions have more than 2 cells.')
       if cm_conv_fast_k < 0 or cm_conv_fast_k > X.shape[0]:
             raise Exception('cm_conv_fast_k must be in the interval [0, n] where n is the number of observations in X.')
 
-      init = X.copy()
-      init['y'] = y if minimize == True else -1 * y
-      init['cell'], cell_centers = _create_blocks(X, y, lower_bound, upper_bound, blocks)
-
-      # find nearest prototype quick
-      if cm_conv_fast_k < 1:
-            fast_k = np.ceil(cm_conv_fast_k * X.shape[0])
+      if minimize == False:
+            y = -1 * y
+
+      # On request (cm_conv_max_dense_size), grids which are small enough to be enumerated (number of cells times offsets) are evaluated
+      # with the dense path, even if cm_conv_sparse = True.
+      if cm_conv_sparse and cm_conv_max_dense_size is not None:
+            cm_conv_sparse = cell_grid.n_cells * len(cell_grid.neighbour_offsets(cm_conv_diag)) > cm_conv_max_dense_size
+
+      if cm_conv_sparse:
+            # Only the triples which contain an occupied cell are considered
+            nbs = cell_grid.occupied_neighbour_triples(diag = cm_conv_diag)
+            representatives, inverse = _find_cell_representatives(X, cell_grid, nbs, landscape_context)
+            convexity_counter = _count_convexity(y[representatives][inverse])
       else:
-            fast_k = cm_conv_fast_k
-      fast_k = int(max(2, fast_k))
-      n_cells = len(cell_centers)
-      nbrs = NearestNeighbors(n_neighbors = fast_k, algorithm='kd_tree').fit(np.vstack([cell_centers, X.to_numpy()]))
-      _, indices = nbrs.kneighbors(np.vstack([cell_centers, X.to_numpy()]))
-      indices = indices[:n_cells] - n_cells
-      nearest_grid_indices = []
-      for i in range(n_cells):
-            x = np.setdiff1d(indices[i], [i - n_cells], assume_unique=True)
-            if len(x[x >= 0]) > 0:
-                  x = x[x >= 0][0] 
-                  nearest_grid_indices.append(x)
-            else:
-                  nearest_grid_indices.append(None)
-      nearest_grid_indices = np.array(nearest_grid_indices)
-      
+            cell_centers = cell_grid.cell_centers()
 
-      # in case none of the nearest observations is a non-cell-center
-      all_centers = np.all(indices < 0, axis = 1)
-      if all_centers.any():
-            n_ctr = all_centers.sum()
-            nbrs_backup = NearestNeighbors(n_neighbors = n_ctr + 1, algorithm='kd_tree').fit(np.vstack([cell_centers[all_centers], X.to_numpy()]))
-            _, backup_indices = nbrs_backup.kneighbors(np.vstack([cell_centers[all_centers], X.to_numpy()]))
-            backup_indices = backup_indices[range(n_ctr), 1:] - n_ctr
-            #if len(backup_indices[backup_indices >= 0]) > 0:
-            backup_indices = np.array([x[x >= 0][0] for x in backup_indices])
-            nearest_grid_indices[all_centers] = backup_indices
-
-      nearest_grid = init.iloc[nearest_grid_indices]
-      nearest_grid = nearest_grid.reset_index(drop = True).drop(columns = 'cell')
-      nearest_grid['represented_cell'] = range(n_cells)
-
-      # find linear neighbours
-      max_cells = np.product(blocks) # = n_cells
-      cell_ids = range(n_cells)
-
-      cell_z = []
-      for cell in cell_ids:
-            # TODO kein nan appenden, einfach continue (überprüfen ob das stimmt, aber ich seh keinen sinn ein None zurück zu geben)
-            if cell < 0 or cell > max_cells-1:
-                  cell_z.append(np.array([np.nan] * len(blocks)))
+            # find nearest prototype quick
+            if cm_conv_fast_k < 1:
+                  fast_k = np.ceil(cm_conv_fast_k * X.shape[0])
             else:
-                  coord = []
-                  for i in range(len(blocks)):
-                        coord.append(cell % blocks[i])
-                        cell = cell // blocks[i]
-                  cell_z.append(np.array(coord) + 1)
-
-      cell_z = np.array(cell_z)
-      if cm_conv_diag:
-            combs = _cartesian_product_efficient([[-1, 0, 1]] * len(blocks))
-            combs = combs[(combs > 0).any(axis = 1)]
-      else:
-            combs = np.identity(dim)
-      
-      nbs = []
-      for i in cell_ids:
-            x = cell_z[i]
-            if ((x == blocks) | (x == 1)).all():
-                  nbs.append(np.array([np.nan]))
-                  continue
-            inner_nb = []
-            for comb in combs:
-                  z = x + comb
-                  # z to cell
-                  if (z > blocks).any() or (z < 1).any():
-                        inner_nb.append(np.array([np.nan]))
-                        continue
-                  z = z - 1
-                  dim_prod = np.hstack([[1], np.cumprod(blocks[:-1])])
-                  succ = (dim_prod * z).sum()
-                  nb = np.array([2 * cell_ids[i] - succ, cell_ids[i], succ])
-                  if (nb >= 0).all() and (nb <= max_cells - 1).all():
-                        inner_nb.append(nb)
-                  else:
-                        inner_nb.append(np.array([np.nan]))
-            nbs.extend(inner_nb)
-
-      #for inner_nb in nbs
-      nbs = np.array([x for x in nbs if not np.isnan(x).all()])
-      if cm_conv_diag and len(nbs) != 0:
-            nbs.sort(axis = 1)
-            nbs = np.unique(nbs, axis = 0)
-            ind = np.array([x[:2] for x in nbs])
-            ind = np.lexsort((ind[:, 0], ind[: , 1]))
-            nbs = nbs[ind]
-
-      convexity_counter = []
-      for nb_block in nbs:
-            x = nearest_grid[nearest_grid.represented_cell.isin(nb_block)]
-            yvals = x.sort_values('represented_cell').y.values
-            # 0. convex.hard, 1. concave.hard, 2. convex.soft, 3. concave.soft
-            counter = np.array([False] * 4)
-            if yvals[1] > yvals[[0, 2]].mean():
-                  counter[3] = True
-                  if yvals[1] > yvals[[0, 2]].max():
-                        counter[1] = True
-            elif yvals[1] < yvals[[0, 2]].mean():
-                  counter[2] = True
-                  if yvals[1] < yvals[[0, 2]].min():
-                        counter[0] = True
-            convexity_counter.append(counter)
-
-      convexity_counter = np.array(convexity_counter).mean(axis = 0)
+                  fast_k = cm_conv_fast_k
+            fast_k = int(max(2, fast_k))
+            n_cells = len(cell_centers)
+            nbrs = NearestNeighbors(n_neighbors = fast_k, algorithm='kd_tree').fit(np.vstack([cell_centers, X]))
+            # Only the neighbours of the cell centers are required
+            _, indices = nbrs.kneighbors(cell_centers)
+            indices = indices - n_cells
+            # The representative of a cell is the nearest observation among the fast_k nearest neighbours of its center
+            nearest_grid_indices = indices[np.arange(n_cells), (indices >= 0).argmax(axis = 1)]
+
+            # in case none of the nearest observations is a non-cell-center
+            all_centers = np.all(indices < 0, axis = 1)
+            if all_centers.any():
+                  n_ctr = all_centers.sum()
+                  nbrs_backup = NearestNeighbors(n_neighbors = n_ctr + 1, algorithm='kd_tree').fit(np.vstack([cell_centers[all_centers], X]))
+                  _, backup_indices = nbrs_backup.kneighbors(cell_centers[all_centers])
+                  backup_indices = backup_indices[:, 1:] - n_ctr
+                  nearest_grid_indices[all_centers] = backup_indices[np.arange(n_ctr), (backup_indices >= 0).argmax(axis = 1)]
+
+            # find linear neighbours and count the convex and concave triples of representative observations
+            nbs = cell_grid.neighbour_triples(diag = cm_conv_diag)
+            convexity_counter = _count_convexity(y[nearest_grid_indices][nbs])
 
       return {
             'cm_conv.convex.hard': convexity_counter[0], 
@@ -746,42 +992,70 @@ def calculate_cm_conv(X, y, lower_bound, upper_bound, blocks = None, minimize =
             'cm_conv.costs_runtime': timedelta(seconds=time.monotonic() - start_time).total_seconds()
       }
 
-def calculate_cm_grad(X, y, lower_bound, upper_bound, blocks = None, minimize = True, cm_conv_diag = False,  cm_conv_fast_k = 0.05):
+# Nearest other observation within the same cell (index and distance) for every observation, -1 and nan for observations alone in their
+# cell. Cells with at most max_dense observations are handled in groups of cells with the same number of observations, based on dense
+# blocks of their pairwise distances. A KD-tree is only built for larger cells.
+def _find_nearest_in_cells(X, cell_grid, max_dense = 64):
+      n, dim = X.shape
+      counts = cell_grid.counts
+      starts = cell_grid.offsets[:-1]
+      X_sorted = X[cell_grid.order]
+      nn = np.full(n, -1)
+      nn_dist = np.full(n, np.nan)
+
+      for size in np.unique(counts[(counts > 1) & (counts <= max_dense)]):
+            cells = np.where(counts == size)[0]
+            chunk_size = max(1, 2 ** 22 // (size * size * dim))
+            for chunk in range(0, len(cells), chunk_size):
+                  rows = starts[cells[chunk:chunk + chunk_size]].reshape(-1, 1) + np.arange(size)
+                  points = X_sorted[rows]
+                  dists = np.sqrt(((points[:, :, None, :] - points[:, None, :, :]) ** 2).sum(axis = 3))
+                  dists[:, np.arange(size), np.arange(size)] = np.inf
+                  nearest = dists.argmin(axis = 2)
+                  nn[rows] = np.take_along_axis(rows, nearest, axis = 1)
+                  nn_dist[rows] = np.take_along_axis(dists, nearest[:, :, None], axis = 2)[:, :, 0]
+
+      for cell in np.where(counts > max_dense)[0]:
+            rows = np.arange(starts[cell], starts[cell] + counts[cell])
+            dists, nearest = cKDTree(X_sorted[rows]).query(X_sorted[rows], k = 2)
+            nn[rows] = rows[nearest[:, 1]]
+            nn_dist[rows] = dists[:, 1]
+
+      # Map positions in the cell-sorted sample back to the observations
+      result = np.full(n, -1)
+      result_dist = np.full(n, np.nan)
+      result[cell_grid.order] = np.where(nn >= 0, cell_grid.order[nn], -1)
+      result_dist[cell_grid.order] = nn_dist
+      return result, result_dist
+
+def calculate_cm_grad(X, y, lower_bound, upper_bound, blocks = None, minimize = True, cm_conv_diag = False,  cm_conv_fast_k = 0.05, cell_grid = None):
       start_time = time.monotonic()
       X, y = _validate_variable_types(X, y)
       dim = X.shape[1]
-      blocks = _check_blocks_variable(X, dim, blocks)
+      cell_grid = _check_cell_grid(X, lower_bound, upper_bound, blocks, cell_grid)
+      blocks = cell_grid.blocks
 
       if blocks.min() <= 2:
             raise Exception('The cell grad features can only be computed when all dimensions have more than 2 cells.')
       if cm_conv_fast_k < 0 or cm_conv_fast_k > X.shape[0]:
             raise Exception('cm_conv_fast_k must be in the interval [0, n] where n is the number of observations in X.')
 
-      init = X.copy()
-      init['y'] = y if minimize == True else -1 * y
-      init['cell'], cell_centers = _create_blocks(X, y, lower_bound, upper_bound, blocks)
-
-      grad_homo = []
-      for cname, cell in init.groupby(['cell']):
-            n_obs = cell.shape[0]
-            funvals = cell['y'].values
-            cell = cell.to_numpy()
-            if n_obs > 2:
-                  nbrs = NearestNeighbors(n_neighbors = 2, algorithm='kd_tree').fit(cell[:, :dim])
-                  distance, nn = nbrs.kneighbors(cell[:, :dim])
-                  norm_vectors = []
-                  for i in range(n_obs):
-                        if distance[i, 1] == 0:
-                              norm_vectors.append(np.array([0] * dim))
-                        else:
-                              nearest = nn[i, 1]
-                              mult = -1 if funvals[i] > funvals[nearest] else 1
-                              norm_vectors.append((cell[nearest, :dim] - cell[i, :dim])/distance[i, 1] * mult)
-                  
-                  norm_vectors = np.array(norm_vectors)
-                  grad_homo.append(np.sqrt(np.sum(np.sum(norm_vectors, axis = 0) ** 2)) / n_obs)
-            else:
-                  grad_homo.append(np.nan)
+      if minimize == False:
+            y = -1 * y
+
+      # Normalized vectors to the nearest observation within the same cell, pointing towards the better one of both
+      nn, nn_dist = _find_nearest_in_cells(X, cell_grid)
+      has_nn = nn >= 0
+      norm_vectors = np.zeros(X.shape)
+      moving = has_nn.copy()
+      moving[has_nn] = nn_dist[has_nn] != 0
+      mult = np.where(y[moving] > y[nn[moving]], -1, 1).reshape(-1, 1)
+      norm_vectors[moving] = (X[nn[moving]] - X[moving]) / nn_dist[moving].reshape(-1, 1) * mult
+
+      # Length of the summed vectors of each cell, relative to the number of observations in the cell
+      counts = cell_grid.counts
+      vector_sums = np.add.reduceat(norm_vectors[cell_grid.order], cell_grid.offsets[:-1], axis = 0)
+      grad_homo = np.where(counts > 2, np.sqrt(np.sum(vector_sums ** 2, axis = 1)) / counts, np.nan)
 
       return {
             'cm_grad.mean': np.nanmean(grad_homo),
@@ -789,20 +1063,25 @@ def calculate_cm_grad(X, y, lower_bound, upper_bound, blocks = None, minimize =
             'cm_grad.costs_runtime': timedelta(seconds=time.monotonic() - start_time).total_seconds()
       }
 
-def calculate_ela_conv(X, y, fun, ela_conv_nsample = 1000, ela_conv_threshold = 1e-10):
+def calculate_ela_conv(X, y, fun, ela_conv_nsample = 1000, ela_conv_threshold = 1e-10, vectorized = False):
       start_time = time.monotonic()
       X, y = _validate_variable_types(X, y)
-      delta = []
-      nfev = 0
+      fun = _create_batch_function(fun, vectorized = vectorized)
+
+      # Draw all pairs of observations and their weights first (in the same order as the random numbers were drawn before)
+      # and evaluate all resulting convex combinations in one call
+      pairs = []
+      weights = []
       for _ in range(ela_conv_nsample):
-            i = np.random.randint(low = 0, high = X.shape[0], size = 2)
-            wt = np.random.uniform(size = 1)[0]
-            wt = np.array([wt, 1 - wt])
-            xn = np.matmul(wt, X.iloc[i].to_numpy())
-            delta.append(fun(xn) - np.matmul(y.iloc[i], wt))
-            nfev += 1
-            
-      delta = np.array(delta)
+            pairs.append(np.random.randint(low = 0, high = X.shape[0], size = 2))
+            weights.append(np.random.uniform(size = 1)[0])
+      pairs = np.array(pairs)
+      weights = np.array(weights)
+      weights = np.column_stack([weights, 1 - weights])
+
+      xn = weights[:, [0]] * X[pairs[:, 0]] + weights[:, [1]] * X[pairs[:, 1]]
+      delta = fun(xn) - (weights * y[pairs]).sum(axis = 1)
+      nfev = len(delta)
 
       return {
             'ela_conv.conv_prob': np.nanmean(delta < -ela_conv_threshold), 
@@ -843,12 +1122,12 @@ def calculate_ela_level(X, y, ela_level_quantiles = [0.1, 0.25, 0.5], interface_
                   mda_mmce_prob = []
             for train_index, test_index in kf.split(X, y_class):
                   lda = LinearDiscriminantAnalysis()
-                  lda.fit(X.iloc[train_index], y_class[train_index])
-                  lda_mmce_prob.append((y_class[test_index].values != lda.predict(X.iloc[test_index])).mean())
+                  lda.fit(X[train_index], y_class[train_index])
+                  lda_mmce_prob.append((y_class[test_index] != lda.predict(X[test_index])).mean())
 
                   qda = QuadraticDiscriminantAnalysis()
-                  qda.fit(X.iloc[train_index], y_class[train_index])
-                  qda_mmce_prob.append((y_class[test_index].values != qda.predict(X.iloc[test_index])).mean())
+                  qda.fit(X[train_index], y_class[train_index])
+                  qda_mmce_prob.append((y_class[test_index] != qda.predict(X[test_index])).mean())
 
                   # TODO Calculation of MDA here
                   if interface_mda_from_R:
@@ -888,7 +1167,7 @@ def calculate_ela_level(X, y, ela_level_quantiles = [0.1, 0.25, 0.5], interface_
       result['ela_level.costs_runtime'] = timedelta(seconds=time.monotonic() - start_time).total_seconds()
       return result
 
-def calculate_ela_curvate(X, y, f, dim, lower_bound, upper_bound, sample_size_factor = 100, delta = 10**-4, eps = 10**-4, zero_tol = np.sqrt(np.nextafter(0, 1)/70**-7), r = 4, v = 2, seed = None):
+def calculate_ela_curvate(X, y, f, dim, lower_bound, upper_bound, sample_size_factor = 100, delta = 10**-4, eps = 10**-4, zero_tol = np.sqrt(np.nextafter(0, 1)/70**-7), r = 4, v = 2, seed = None, vectorized = False):
       start_time = time.monotonic()
 
       X, y = _validate_variable_types(X, y)
@@ -900,17 +1179,19 @@ def calculate_ela_curvate(X, y, f, dim, lower_bound, upper_bound, sample_size_fa
       if X.shape[0] < N:
             N = X.shape[0]
 
-      def decorator(f, x):
-            decorator.fvals += 1
-            return f(x)
+      batch_f = _create_batch_function(f, vectorized = vectorized)
 
-      decorator.fvals = 0
-      original_f = f
-      f = partial(decorator, original_f)
+      # Same draw as pd.DataFrame.sample(N) with the global random state
+      x_sample = X[np.random.choice(X.shape[0], size = N, replace = False)]
+      grad, hess, nfev = _calculate_derivatives(batch_f, x_sample, delta, eps, zero_tol, r, v)
 
-      wfunc = partial(_calculate_num_derivate, f, lower_bound, upper_bound, delta, eps, zero_tol, r, v)
-      derivs = X.sample(N).apply(lambda x: wfunc(x.values), axis = 1)
-      derivs = np.array([x for x in derivs]).reshape(3, derivs.shape[0])
+      grad = np.abs(grad)
+      eig = np.abs(np.linalg.eigvalsh(hess))
+      with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            derivs = np.array([
+                  np.sqrt(np.sum(grad ** 2, axis = 1)),
+                  np.where(grad.min(axis = 1) > 0, grad.max(axis = 1) / grad.min(axis = 1), np.nan),
+                  np.where(eig.min(axis = 1) > 0, eig.max(axis = 1) / eig.min(axis = 1), np.nan)])
       
       return {
             'ela_curv.grad_norm.min': np.nanmin(derivs[0]),
@@ -937,19 +1218,23 @@ def calculate_ela_curvate(X, y, f, dim, lower_bound, upper_bound, sample_size_fa
             'ela_curv.hessian_cond.max': np.nanmax(derivs[2]),
             'ela_curv.hessian_cond.sd': np.nanstd(derivs[2], ddof = 1),
             'ela_curv.hessian_cond.nas': np.mean(np.isnan(derivs[2])),
-            'ela_curv.costs_fun_evals:': decorator.fvals,
+            'ela_curv.costs_fun_evals:': nfev,
             'ela_curv.costs_runtime': timedelta(seconds=time.monotonic() - start_time).total_seconds()
       }
 
-def calculate_ela_local(X, y, f, dim, lower_bound, upper_bound, minimize = True, ela_local_local_searches_factor = 50, ela_local_optim_method = 'L-BFGS-B', ela_local_clust_method = 'single', seed = None, **minimizer_kwargs):
+def calculate_ela_local(X, y, f, dim, lower_bound, upper_bound, minimize = True, ela_local_local_searches_factor = 50, ela_local_optim_method = 'L-BFGS-B', ela_local_clust_method = 'single', seed = None, vectorized = False, n_jobs = None, backend = 'thread', local_search_store = None, **minimizer_kwargs):
       start_time = time.monotonic()
+      _check_backend(backend)
       X, y = _validate_variable_types(X, y)
       lower_bound, upper_bound = _transform_bounds_to_canonical(dim, lower_bound, upper_bound)
       N = ela_local_local_searches_factor * dim
+      local_search_store = _check_local_search_store(local_search_store, f, lower_bound, upper_bound, minimize)
+      batch_f = _create_batch_function(f, vectorized = vectorized)
+      f = _create_scalar_function(f, vectorized = vectorized)
       if not minimize:
             y = y * -1
-            original_f = f
-            f = lambda x: -1 * original_f(x)
+            f = partial(_negate_function, f)
+            batch_f = partial(_negate_function, batch_f)
 
       if X.shape[0] < N:
             raise Exception(f'X contains less then the required {N} (= dim * ela_local_local_searches_factor) starting points')
@@ -957,31 +1242,26 @@ def calculate_ela_local(X, y, f, dim, lower_bound, upper_bound, minimize = True,
             np.random.seed(seed)
       
       bounds = list(zip(lower_bound, upper_bound))
-      x_opts = []
-      fes = []
 
-      for _, row in X.sample(N, replace = False).iterrows():
-            opt_result = scipy_minimize(f, row.values, method = ela_local_optim_method, bounds = bounds, **minimizer_kwargs)
-            x_opts.append(opt_result.x)
-            fes.append(opt_result.nfev)
-      
-      x_opts = np.array(x_opts)
-      fes = np.array(fes)
-
-      cl = linkage(x_opts, method = ela_local_clust_method)
-      nodes = _order_cluster_tree(cl)
-
-      heights = np.array([x.dist for x in nodes])
-      c_assign = cut_tree(cl, height = np.quantile(heights, 0.1)).flatten()
+      # Same draw as pd.DataFrame.sample(N) with the global random state. All starting points are drawn before the local searches are
+      # dispatched, hence the results do not depend on the number of workers.
+      starts = X[np.random.choice(X.shape[0], size = N, replace = False)]
+      settings = LocalSearchStore.settings_key(ela_local_optim_method, **minimizer_kwargs)
+      results, fresh_fes, reused_fes = _run_stored_local_searches(f, ela_local_optim_method, bounds, minimizer_kwargs, starts, local_search_store, settings, n_jobs = n_jobs, backend = backend)
+      x_opts = np.array([x for x, _, _ in results])
+      # Evaluations of the search which yields each optimum, i.e., of the stored search for a reused optimum
+      fes = np.array([nfev for _, _, nfev in results])
+
+      # The single linkage clustering is the minimum spanning tree of the optima
+      if ela_local_clust_method == 'single':
+            edges, heights = _minimum_spanning_tree(x_opts)
+            c_assign = _single_linkage_clusters(x_opts, edges, heights, np.quantile(heights, 0.1))
+      else:
+            cl = linkage(x_opts, method = ela_local_clust_method)
+            c_assign = cut_tree(cl, height = np.quantile(cl[:, 2], 0.1)).flatten()
       clust_sizes = np.array([(c_assign == x).sum()/len(np.unique(c_assign)) for x in np.unique(c_assign)])
-      c_centers = []
-      center_fvals = []
-      for i in np.unique(c_assign):
-            center = x_opts[c_assign == i].mean(axis = 0)
-            c_centers.append(center)
-            center_fvals.append(f(center))
-      c_centers = np.array(c_centers)
-      center_fvals = np.array(center_fvals)
+      c_centers = np.array([x_opts[c_assign == i].mean(axis = 0) for i in np.unique(c_assign)])
+      center_fvals = batch_f(c_centers)
 
       center_best_idx = center_fvals == center_fvals.min()
       center_worst_idx = center_fvals == center_fvals.max()
@@ -1000,7 +1280,8 @@ def calculate_ela_local(X, y, f, dim, lower_bound, upper_bound, minimize = True,
             'ela_local.fun_evals.uq': np.quantile(fes, 0.75),
             'ela_local.fun_evals.max': fes.max(),
             'ela_local.fun_evals.sd': fes.std(ddof = 1),
-            'ela_local.additional_function_eval': fes.sum() + len(c_centers),
+            'ela_local.additional_function_eval': fresh_fes + len(c_centers),
+            'ela_local.reused_function_eval': reused_fes,
             'ela_local.costs_runtime': timedelta(seconds=time.monotonic() - start_time).total_seconds()
 
       }
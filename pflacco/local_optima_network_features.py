@@ -1,81 +1,219 @@
 import pandas as pd
 import scipy.optimize as opt
 import numpy as np
+import json
+import os
 import random
 import time
 
+from concurrent.futures import as_completed
 from datetime import timedelta
+from functools import partial
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import breadth_first_order
 
-from .pflacco_utils import _transform_bounds_to_canonical
+from .pflacco_utils import _transform_bounds_to_canonical, _create_scalar_function, _check_n_jobs, _check_backend, _create_executor, _create_seed_sequence, _check_local_search_store, LocalSearchStore, _NodeIndex
 
 def _consolidate_edges(edges):
     edges = edges.groupby(['source', 'target']).size().reset_index(name='weight')
     return edges
 
+# Merges each node (in the order of the nodes) into the first target of its outgoing edges (in the order of the edges) with the same fitness.
+# The representative of every original node is kept in label, members holds the original nodes merged into a representative. Edges are
+# stored as integer arrays of their original end points, the current end points are looked up in label.
 def _consolide_nodes_same_fitness(nodes, edges, precision = 1e-5):
+    n = len(nodes)
+    fval = nodes['fval'].to_numpy()
+    neutrality = nodes['neutrality'].to_numpy().copy()
+    source = edges['source'].to_numpy().astype(int)
+    target = edges['target'].to_numpy().astype(int)
+
+    # Outgoing edges of every node in the order of the edges
+    order = np.argsort(source, kind = 'stable')
+    ptr = np.searchsorted(source[order], np.arange(n + 1))
+
+    label = np.arange(n)
+    members = [[i] for i in range(n)]
+    deleted = np.zeros(len(source), dtype = bool)
+    for idx in range(n):
+        if len(members[idx]) == 1:
+            rows = order[ptr[idx]:ptr[idx + 1]]
+        else:
+            rows = np.sort(np.concatenate([order[ptr[i]:ptr[i + 1]] for i in members[idx]]))
+        rows = rows[~deleted[rows]]
+        if len(rows) == 0:
+            continue
+        targets = label[target[rows]]
+        same_fitness = np.abs(fval[targets] - fval[idx]) < precision
+        if same_fitness.any():
+            target_node_id = targets[np.argmax(same_fitness)]
+            if target_node_id != idx:
+                # Delete edges between node and target_node with same fval, the remaining edges are transferred to target_node
+                deleted[rows[targets == target_node_id]] = True
+                neutrality[target_node_id] += neutrality[idx]
+                label[members[idx]] = target_node_id
+                members[target_node_id].extend(members[idx])
+                members[idx] = []
+
     result_nodes = nodes.copy()
-    consolidated_nodes = {}
-    for idx, node in nodes.iterrows():
-        if idx in result_nodes.index:
-            adjacent_nodes = nodes.iloc[edges[edges['source'] == idx]['target']]
-            adjacent_nodes = adjacent_nodes[np.abs(adjacent_nodes['fval'] - node['fval']) < precision]
-            if adjacent_nodes.shape[0] > 0:
-                target_node_id = adjacent_nodes['id'].iloc[0]
-                # check for reciprocal relationship between two nodes with same fval
-                if str(target_node_id) not in consolidated_nodes.keys() and idx != target_node_id:
-                    # Delete current node from results
-                    result_nodes = result_nodes[result_nodes['id'] != idx]
-                    # Update neutrality value
-                    result_nodes.loc[target_node_id]['neutrality'] += node['neutrality']
-                    # Delete edge between node and target_node with same fval
-                    edges = edges[~((edges['source'] == idx) & (edges['target'] == target_node_id))]
-                    # Transfer incoming edges of node to target_node
-                    edges.loc[edges['target'] == idx, 'target'] = target_node_id
-                    # transfer outgoing edges of node to target_node
-                    edges.loc[edges['source'] == idx, 'source'] = target_node_id
-                    consolidated_nodes[str(idx)] = target_node_id
+    result_nodes['neutrality'] = neutrality
+    result_nodes = result_nodes[label == np.arange(n)]
 
     # Remove edges from nodes which point to itself (introduced by the consolidation of neutral nodes)
-    edges = edges[~(edges['source'] == edges['target'])]
+    source = label[source[~deleted]]
+    target = label[target[~deleted]]
+    edges = pd.DataFrame({'source': source, 'target': target})
+    edges = edges[edges['source'] != edges['target']]
 
     return result_nodes, edges
 
+# Node and edge store of a single LON run. The method minfound is the callback of the basin hopping, which records accepted local optima.
+class _LocalOptimaNetwork:
+    def __init__(self):
+        self.nodes = []
+        self.edges = []
+        self.last = 0
+        self.restart = True
+        self.index = _NodeIndex()
+
+    def add_node(self, fval, x):
+        self.nodes.append([fval, x])
+        self.index.add(x)
+        return len(self.nodes)-1
+
+    def minfound(self, x, f, accept):
+        if accept:
+            #Check if an existing local minimum is too close
+            duplicate, node_index = self.index.find(x)
+            if not duplicate:
+                #The AC only needs to be checked if it is not a restart
+                node_index = self.add_node(f, x)
+                if not self.restart:
+                    self.edges.append([self.last, node_index])
+                self.last = node_index
+            else:
+                if not self.restart and not self.last == node_index:
+                    self.edges.append([self.last, node_index])
+                self.last = node_index
+
+            self.restart = False
+
+    # Adds the nodes and edges of another network, duplicates are mapped to the first node in their neighbourhood
+    def merge(self, nodes, edges):
+        index = []
+        for fval, x in nodes:
+            duplicate, node_index = self.index.find(x)
+            if not duplicate:
+                node_index = self.add_node(fval, x)
+            index.append(node_index)
+        for source, target in edges:
+            if index[source] != index[target]:
+                self.edges.append([index[source], index[target]])
+
+# Custom method for minimize, which runs the actual method and records the start, optimum, objective value and function evaluations of
+# every local search of the basin hopping (to add them to a LocalSearchStore)
+class _RecordingMinimizer:
+    def __init__(self, method):
+        self.method = method
+        self.records = []
+
+    def __call__(self, fun, x0, args = (), jac = None, hess = None, hessp = None, bounds = None, constraints = (), callback = None, **options):
+        res = opt.minimize(fun, x0, args = args, method = self.method, jac = jac, hess = hess, hessp = hessp, bounds = bounds, constraints = constraints, callback = callback, options = options)
+        self.records.append((np.copy(x0), res.x, res.fun, res.nfev))
+        return res
+
+# Returns the number of function evaluations and, if record is True, the local searches of the restart
+def _basin_hopping_restart(lon, f, x0, stepsize, stopping_threshold, minimizer_kwargs, seed = None, record = False):
+    if record:
+        minimizer_kwargs = dict(minimizer_kwargs, method = _RecordingMinimizer(minimizer_kwargs.get('method')))
+    lon.restart = True
+    bh_res = opt.basinhopping(f, x0, T=0.0, minimizer_kwargs=minimizer_kwargs, stepsize = stepsize, callback=lon.minfound, niter=stopping_threshold, seed = seed)
+    lon.restart = True
+    return bh_res['nfev'], minimizer_kwargs['method'].records if record else []
+
+# A single basin hopping restart with its own random stream, returns the nodes and edges of its subnetwork
+def _independent_basin_hopping_restart(f, lower_bound, upper_bound, stepsize, stopping_threshold, minimizer_kwargs, record, seed_sequence):
+    rng = np.random.default_rng(seed_sequence)
+    lon = _LocalOptimaNetwork()
+    x0 = rng.uniform(lower_bound, upper_bound)
+    nfev, records = _basin_hopping_restart(lon, f, x0, stepsize, stopping_threshold, minimizer_kwargs, seed = rng, record = record)
+    return lon.nodes, lon.edges, nfev, records
 
+# Identifies the settings of a LON run, which determine the network built by its restarts. Arbitrary callables cannot be told apart by
+# their names (e.g., all lambdas or all cocoex problems share one), hence the objective function is identified by its stable problem id
+# (f.id, e.g., of cocoex problems) if it has one and otherwise by its value at the center of the bounds. This additional evaluation is
+# not counted in the function evaluations of the LON. Deterministic objective functions are assumed.
+def _checkpoint_fingerprint(f, scalar_f, lower_bound, upper_bound, random_seed, stepsize, stopping_threshold, minimizer_kwargs):
+    problem_id = getattr(f, 'id', None)
+    if not isinstance(problem_id, str):
+        problem_id = float(scalar_f((np.asarray(lower_bound, dtype = float) + np.asarray(upper_bound, dtype = float)) / 2))
+    return json.dumps({
+        'f': getattr(f, '__qualname__', type(f).__name__),
+        'problem_id': problem_id,
+        'lower_bound': np.asarray(lower_bound, dtype = float).tolist(),
+        'upper_bound': np.asarray(upper_bound, dtype = float).tolist(),
+        'random_seed': random_seed,
+        'stepsize': stepsize,
+        'stopping_threshold': stopping_threshold,
+        'minimizer_kwargs': {k: v for k, v in minimizer_kwargs.items() if k != 'bounds'}
+    }, sort_keys = True, default = str)
 
-# checks whether x is in the neighbourhood of any node
-def _neighborhood(coord, threshold = 1e-5):
-    node_index = -1
-    duplicate = False
-    # do not check anything if the list is empty
-    if len(nodes) > 0: 
-        # compute all differences in all dimension to given coord
-        dist = [[abs(x1 - coord1) for (x1, coord1) in zip(x[1], coord)] for x in nodes]
-        for i in range(len(dist)):
-            if all(xi < threshold for xi in dist[i]):
-                duplicate = True
-                node_index = i
-                break
-
-    return duplicate, node_index
-
-def _minfound(x, f, accept):
-    global restart, last, log
-
-    if accept:
-        #Check if an existing local minimum is too close
-        duplicate, node_index = _neighborhood(x)
-        if not duplicate:
-            #The AC only needs to be checked if it is not a restart
-            nodes.append([f, x])
-            if not restart:
-                edges.append([last, len(nodes)-1])
-            last = len(nodes)-1
+# Stores the nodes, edges, costs and number of completed restarts of a LON run together with the state of its random numbers and the
+# fingerprint of its settings in a compressed npz file. If the local searches of the run are recorded (for a LocalSearchStore), the
+# distinct ones are stored as well. The file is written to a temporary file first, such that an interrupted write does not destroy the
+# previous checkpoint.
+def _save_checkpoint(checkpoint_file, lon, dim, nfev, n_restarts, fingerprint, entropy = None, records = None):
+    state = {
+        'fvals': np.array([x[0] for x in lon.nodes], dtype = float),
+        'coords': np.array([x[1] for x in lon.nodes], dtype = float).reshape(-1, dim),
+        'edges': np.array(lon.edges, dtype = int).reshape(-1, 2),
+        'nfev': nfev,
+        'n_restarts': n_restarts,
+        'fingerprint': fingerprint
+    }
+    if entropy is None:
+        _, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+        state.update({'mt19937_keys': keys, 'mt19937_pos': pos, 'has_gauss': has_gauss, 'cached_gaussian': cached_gaussian})
+    else:
+        state['entropy'] = json.dumps(entropy)
+    if records is not None:
+        state.update({
+            'record_starts': np.array([x[0] for x in records], dtype = float).reshape(-1, dim),
+            'record_optima': np.array([x[1] for x in records], dtype = float).reshape(-1, dim),
+            'record_fvals': np.array([x[2] for x in records], dtype = float),
+            'record_nfevs': np.array([x[3] for x in records], dtype = int),
+            'record_settings': np.array([x[4] for x in records], dtype = str)
+        })
+
+    tmp_file = checkpoint_file + '.tmp'
+    with open(tmp_file, 'wb') as fh:
+        np.savez_compressed(fh, **state)
+    os.replace(tmp_file, checkpoint_file)
+
+# Restores a LON run from a checkpoint into lon. Without entropy, i.e., for a sequential run, the global random state is restored as well.
+# The recorded local searches are returned as well (None if the checkpoint does not contain them).
+def _load_checkpoint(checkpoint_file, lon, dim, fingerprint, basin_hopping_iteration, entropy = None):
+    with np.load(checkpoint_file) as state:
+        if state['coords'].shape[1] != dim:
+            raise Exception(f'The checkpoint {checkpoint_file} was created for a different problem dimension.')
+        if 'fingerprint' not in state or str(state['fingerprint']) != fingerprint:
+            raise Exception(f'The checkpoint {checkpoint_file} was created with different settings (objective function, bounds, random_seed, stepsize, stopping_threshold or minimizer_kwargs).')
+        if ('entropy' in state) != (entropy is not None):
+            raise Exception(f'The checkpoint {checkpoint_file} was created with a different value of n_jobs (None vs. an integer).')
+        if int(state['n_restarts']) > basin_hopping_iteration:
+            raise Exception(f'The checkpoint {checkpoint_file} already contains {int(state["n_restarts"])} restarts, which is more than basin_hopping_iteration.')
+        for fval, x in zip(state['fvals'], state['coords']):
+            lon.add_node(float(fval), x)
+        lon.edges = state['edges'].tolist()
+        if entropy is None:
+            np.random.set_state(('MT19937', state['mt19937_keys'], int(state['mt19937_pos']), int(state['has_gauss']), float(state['cached_gaussian'])))
         else:
-            if not restart and not last == node_index:
-                edges.append([last, node_index])
-            last = node_index
+            entropy = json.loads(str(state['entropy']))
+        records = None
+        if 'record_optima' in state:
+            records = list(zip(state['record_starts'], state['record_optima'], state['record_fvals'].tolist(), state['record_nfevs'].tolist(), state['record_settings'].tolist()))
 
-        restart = False
+        return int(state['nfev']), int(state['n_restarts']), entropy, records
 
 '''
 def create_graph(nodes, edges):
@@ -90,13 +228,14 @@ def create_graph(nodes, edges):
     #nx.drawing.nx_pydot.write_dot(graph, f'lon_results/dot_results/graph_{problem}_{fun_id}_{inst}_{dim}.dot')
 '''
 
-def compute_local_optima_network(f, dim, lower_bound, upper_bound, random_seed = None, stepsize = 2, basin_hopping_iteration = 100, stopping_threshold = 1000, minimizer_kwargs = None):
-    global nodes, edges, last, restart
-    restart = True
-    nodes = []
-    edges = []
-    last = 0
-
+# With n_jobs = None, the restarts run one after another on the global random state. Otherwise, every restart gets its own random stream
+# (spawned from random_seed, or from a seed drawn from the global random state), the restarts are distributed over n_jobs workers and
+# their subnetworks are merged in the order of the restarts. The result is then independent of n_jobs.
+# If a checkpoint_file is given, the run is saved every checkpoint_interval restarts and continued from an existing checkpoint. A
+# finished network can be extended by calling it again with a larger basin_hopping_iteration, which only performs the additional
+# restarts (nfev includes the evaluations of all restarts).
+def compute_local_optima_network(f, dim, lower_bound, upper_bound, random_seed = None, stepsize = 2, basin_hopping_iteration = 100, stopping_threshold = 1000, minimizer_kwargs = None, vectorized = False, n_jobs = None, backend = 'thread', checkpoint_file = None, checkpoint_interval = 10, local_search_store = None):
+    _check_backend(backend)
     if random_seed is not None:
         np.random.seed(random_seed)
         random.seed(random_seed)
@@ -109,17 +248,71 @@ def compute_local_optima_network(f, dim, lower_bound, upper_bound, random_seed =
                 'ftol': 1e-7
             }
         }
+    if checkpoint_interval < 1:
+        raise Exception('"checkpoint_interval" must be a positive integer.')
     lower_bound, upper_bound = _transform_bounds_to_canonical(dim, lower_bound, upper_bound)
-    minimizer_kwargs['bounds'] = list(zip(lower_bound, upper_bound))
-    
+    # The optima of the local searches of the basin hopping are only added to the store, the LON itself does not reuse stored optima
+    local_search_store = _check_local_search_store(local_search_store, f, lower_bound, upper_bound)
+    record = local_search_store is not None
+    if record:
+        settings = LocalSearchStore.settings_key(**dict({'method': None}, **minimizer_kwargs))
+        # The distinct local searches of this run, which are saved with the checkpoints
+        run_store = LocalSearchStore(tolerance = local_search_store.tolerance)
+
+    lon = _LocalOptimaNetwork()
     nfev = 0
-    for _ in range(basin_hopping_iteration):
-        x0 = np.random.uniform(lower_bound, upper_bound, dim)
-        bh_res = opt.basinhopping(f, x0, T=0.0, minimizer_kwargs=minimizer_kwargs, stepsize = stepsize, callback=_minfound, niter=stopping_threshold)
-        restart = True
-        nfev += bh_res['nfev']
+    n_restarts = 0
+    entropy = None if n_jobs is None else _create_seed_sequence(random_seed).entropy
+    original_f = f
+    f = _create_scalar_function(f, vectorized = vectorized)
+    if checkpoint_file is not None:
+        fingerprint = _checkpoint_fingerprint(original_f, f, lower_bound, upper_bound, random_seed, stepsize, stopping_threshold, minimizer_kwargs)
+        if os.path.exists(checkpoint_file):
+            nfev, n_restarts, entropy, records = _load_checkpoint(checkpoint_file, lon, dim, fingerprint, basin_hopping_iteration, entropy = entropy)
+            if record:
+                if records is None:
+                    raise Exception(f'The checkpoint {checkpoint_file} was created without a local_search_store, its local searches cannot be added to the store.')
+                for start, optimum, fval, search_nfev, search_settings in records:
+                    run_store.add(start, optimum, fval, search_nfev, search_settings)
+                    local_search_store.add(start, optimum, fval, search_nfev, search_settings)
+    minimizer_kwargs['bounds'] = list(zip(lower_bound, upper_bound))
+
+    if n_jobs is None:
+        while n_restarts < basin_hopping_iteration:
+            x0 = np.random.uniform(lower_bound, upper_bound, dim)
+            restart_nfev, records = _basin_hopping_restart(lon, f, x0, stepsize, stopping_threshold, minimizer_kwargs, record = record)
+            nfev += restart_nfev
+            for start, optimum, fval, search_nfev in records:
+                run_store.add(start, optimum, fval, search_nfev, settings)
+                local_search_store.add(start, optimum, fval, search_nfev, settings)
+            n_restarts += 1
+            if checkpoint_file is not None and (n_restarts % checkpoint_interval == 0 or n_restarts == basin_hopping_iteration):
+                _save_checkpoint(checkpoint_file, lon, dim, nfev, n_restarts, fingerprint, records = run_store.records() if record else None)
+    elif n_restarts < basin_hopping_iteration:
+        restart = partial(_independent_basin_hopping_restart, f, lower_bound, upper_bound, stepsize, stopping_threshold, minimizer_kwargs, record)
+        # The i-th child of a SeedSequence does not depend on the number of spawned children
+        seed_sequences = np.random.SeedSequence(entropy).spawn(basin_hopping_iteration)
+        n_jobs = _check_n_jobs(n_jobs, backend)
+        # All remaining restarts are submitted at once. Finished subnetworks are merged as soon as all previous restarts are merged, the
+        # checkpoint always contains the merged restarts.
+        with _create_executor(n_jobs, backend) as executor:
+            futures = {executor.submit(restart, seed_sequences[i]): i for i in range(n_restarts, basin_hopping_iteration)}
+            finished = {}
+            for future in as_completed(futures):
+                finished[futures[future]] = future.result()
+                while n_restarts in finished:
+                    sub_nodes, sub_edges, sub_nfev, records = finished.pop(n_restarts)
+                    lon.merge(sub_nodes, sub_edges)
+                    nfev += sub_nfev
+                    for start, optimum, fval, search_nfev in records:
+                        run_store.add(start, optimum, fval, search_nfev, settings)
+                        local_search_store.add(start, optimum, fval, search_nfev, settings)
+                    n_restarts += 1
+                    if checkpoint_file is not None and (n_restarts % checkpoint_interval == 0 or n_restarts == basin_hopping_iteration):
+                        _save_checkpoint(checkpoint_file, lon, dim, nfev, n_restarts, fingerprint, entropy = entropy, records = run_store.records() if record else None)
 
-    nodes = pd.DataFrame(np.array([np.array([x, nodes[x][0], 1]) for x in range(len(nodes))]), columns = ['id', 'fval', 'neutrality'])
+    nodes, edges = lon.nodes, lon.edges
+    nodes = pd.DataFrame({'id': np.arange(len(nodes), dtype = float), 'fval': np.array([x[0] for x in nodes], dtype = float), 'neutrality': 1.0})
     edges = pd.DataFrame(edges, columns = ['source', 'target'])
     nodes, edges = _consolide_nodes_same_fitness(nodes, edges)
     edges = _consolidate_edges(edges)
@@ -130,7 +323,13 @@ def compute_local_optima_network(f, dim, lower_bound, upper_bound, random_seed =
 def _compute_lon_features(nodes, edges, f_opt = None):
     n_optima = len(nodes)
     neutral = nodes.loc[nodes['neutrality'] > 1, 'neutrality'].sum()/nodes['neutrality'].sum()
-    n_funnels = len([x for x in nodes['id'] if x not in edges['source'].unique().tolist()])
+
+    # Adjacency matrix of the nodes (ids are mapped to their position in nodes), funnels are sinks without outgoing edges
+    ids = nodes['id'].to_numpy()
+    source = np.searchsorted(ids, edges['source'].to_numpy())
+    target = np.searchsorted(ids, edges['target'].to_numpy())
+    graph = csr_matrix((np.ones(len(source)), (source, target)), shape = (n_optima, n_optima))
+    n_funnels = int((np.bincount(source, minlength = n_optima) == 0).sum())
 
     result = {
         'lon.n_optima': n_optima,
@@ -140,25 +339,23 @@ def _compute_lon_features(nodes, edges, f_opt = None):
     }
     
     if f_opt is not None:
-        gfunnels = nodes[round(nodes['fval'], 8) == round(f_opt, 8)]
-        tmp = []
-        for _, funnel_ in gfunnels.iterrows():
-            loop_list = [funnel_['id']]
-            while len(loop_list) > 0:
-                node = loop_list.pop()
-                tmp.append(node)
-                inc_edges = edges.loc[edges['target'] == node, 'source']
-                loop_list.extend(inc_edges.tolist())
-
-        result['lon.global_funnel_strength_norm'] = len(np.unique(tmp))/n_optima
+        # Nodes from which a global optimum can be reached, i.e., a reverse search through the incoming edges
+        gfunnels = np.flatnonzero(nodes['fval'].round(8).to_numpy() == round(f_opt, 8))
+        reverse_graph = graph.T.tocsr()
+        in_funnel = np.zeros(n_optima, dtype = bool)
+        for funnel_ in gfunnels:
+            in_funnel[breadth_first_order(reverse_graph, funnel_, directed = True, return_predecessors = False)] = True
+
+        result['lon.global_funnel_strength_norm'] = in_funnel.sum()/n_optima
 
     return result
 
 
-def compute_lon(f, dim, l_bound, u_bound, f_opt = None, stepsize = 2, basin_hopping_iteration = 100, stopping_threshold = 1000, minimizer_kwargs = None, random_seed = None):
+def compute_lon(f, dim, l_bound, u_bound, f_opt = None, stepsize = 2, basin_hopping_iteration = 100, stopping_threshold = 1000, minimizer_kwargs = None, random_seed = None, vectorized = False, n_jobs = None, backend = 'thread', checkpoint_file = None, checkpoint_interval = 10, local_search_store = None):
     start_time = time.monotonic()
+    _check_backend(backend)
 
-    nodes, edges, nfev = compute_local_optima_network(f, dim, l_bound, u_bound, random_seed = random_seed, stepsize = stepsize, basin_hopping_iteration = basin_hopping_iteration, stopping_threshold = stopping_threshold, minimizer_kwargs = minimizer_kwargs)
+    nodes, edges, nfev = compute_local_optima_network(f, dim, l_bound, u_bound, random_seed = random_seed, stepsize = stepsize, basin_hopping_iteration = basin_hopping_iteration, stopping_threshold = stopping_threshold, minimizer_kwargs = minimizer_kwargs, vectorized = vectorized, n_jobs = n_jobs, backend = backend, checkpoint_file = checkpoint_file, checkpoint_interval = checkpoint_interval, local_search_store = local_search_store)
     lon = _compute_lon_features(nodes, edges, f_opt = f_opt)
 
     lon['lon.additional_function_eval'] = nfev
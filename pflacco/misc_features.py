@@ -1,21 +1,20 @@
 import numpy as np
-import pandas as pd
 import time
 
 from datetime import timedelta
-from scipy.spatial.distance import pdist, squareform
-from scipy.stats import gaussian_kde
-from scipy.stats import entropy, moment
+from scipy.spatial.distance import cdist, pdist, squareform
+from scipy.stats import entropy
 from SALib.analyze import sobol
 
-from .pflacco_utils import _transform_bounds_to_canonical, _validate_variable_types, _determine_max_n_blocks, _check_blocks_variable, _create_blocks
+from .pflacco_utils import _transform_bounds_to_canonical, _determine_max_n_blocks, _check_blocks_variable, _create_batch_function, _check_landscape_context, _check_backend
 from .sampling import _create_local_search_sample, create_initial_sample, _levy_random_walk
 
-def calculate_hill_climbing(f, dim, lower_bound, upper_bound, n_runs = 100, budget_factor_per_run = 1000, method = 'L-BFGS-B', minimize = True, seed = None, minkowski_p = 2):
+def calculate_hill_climbing(f, dim, lower_bound, upper_bound, n_runs = 100, budget_factor_per_run = 1000, method = 'L-BFGS-B', minimize = True, seed = None, minkowski_p = 2, vectorized = False, local_search_store = None, n_jobs = None, backend = 'thread'):
       start_time = time.monotonic()
+      _check_backend(backend)
       lower_bound, upper_bound = _transform_bounds_to_canonical(dim, lower_bound, upper_bound)
 
-      opt_result, nfvals = _create_local_search_sample(f, dim, lower_bound, upper_bound, n_runs = n_runs, budget_factor_per_run=budget_factor_per_run, method = method, minimize = minimize, seed = seed)
+      opt_result, nfvals, reused_nfvals = _create_local_search_sample(f, dim, lower_bound, upper_bound, n_runs = n_runs, budget_factor_per_run=budget_factor_per_run, method = method, minimize = minimize, seed = seed, vectorized = vectorized, local_search_store = local_search_store, n_jobs = n_jobs, backend = backend)
 
       cdist_mat = pdist(opt_result, metric='minkowski', p = minkowski_p)
       dist_mean = cdist_mat.mean()
@@ -32,63 +31,76 @@ def calculate_hill_climbing(f, dim, lower_bound, upper_bound, n_runs = 100, budg
             'hill_climbing.avg_dist_local_to_global': dist_global_local_mean,
             'hill_climbing.std_dist_local_to_global': dist_global_local_std,
             'hill_climbing.additional_function_eval': nfvals,
+            'hill_climbing.reused_function_eval': reused_nfvals,
             'hill_climbing.costs_runtime': timedelta(seconds=time.monotonic() - start_time).total_seconds()
       }
       
-def calculate_gradient(f, dim, lower_bound, upper_bound, step_size = None, budget_per_random_walk = 1000, seed = None):
+# Positions of a coordinate after each of n steps of size step, starting at start in the direction sign. If a step would leave the bounds,
+# the direction is reversed. The positions of each straight segment are accumulated with cumsum, i.e., in the same way as stepwise.
+def _reflected_walk(start, sign, step, lower_bound, upper_bound, n):
+      positions = []
+      x = start
+      reversed_ = False
+      while n > 0:
+            candidates = np.cumsum(np.concatenate([[x], np.full(n, sign * step)]))[1:]
+            inside = (candidates <= upper_bound) & (candidates >= lower_bound)
+            # The first step after a reversal is not checked again
+            inside[0] = inside[0] or reversed_
+            k = n if inside.all() else np.argmin(inside)
+            positions.append(candidates[:k])
+            n -= k
+            if k > 0:
+                  x = candidates[k - 1]
+            sign = -sign
+            reversed_ = True
+
+      return np.concatenate(positions) if len(positions) > 0 else np.zeros(0)
+
+def calculate_gradient(f, dim, lower_bound, upper_bound, step_size = None, budget_per_random_walk = 1000, seed = None, vectorized = False):
       start_time = time.monotonic()
       lower_bound, upper_bound = _transform_bounds_to_canonical(dim, lower_bound, upper_bound)
+      f = _create_batch_function(f, vectorized = vectorized)
 
       if seed is not None:
             np.random.seed(seed)
 
       if step_size is None:
-            step_size = np.array([(upper_bound[i] - lower_bound[i]) * dim /1000 for i in range(dim)])
-      elif not isinstance(step_size, list) and not isinstance(step_size, np.array):
-            step_size = np.array([step_size] * dim)
+            step_size = (upper_bound - lower_bound) * dim / 1000
+      elif np.isscalar(step_size):
+            step_size = np.array([step_size] * dim, dtype = 'float64')
+      else:
+            step_size = np.asarray(step_size, dtype = 'float64')
 
-      nfev = 0
-      g_avgs = []
-      g_devs = []
+      # Generate all random walks first and evaluate them afterwards in one call. Each step moves a random coordinate, hence the walk is
+      # composed of the (reflected) walks of the single coordinates, which are forward filled over the steps in which they do not move.
+      walks = []
       for _ in range(dim):
-            result = []
             dd = np.random.choice([0, 1], size = dim)
-            bounds = list(zip(lower_bound, upper_bound))
-            x = np.array([bounds[x][dd[x]] for x in range(dim)], dtype = 'float64')
-            nfev += 1
-            fval = f(x)
-            signs = np.array([1 if x == 0 else -1 for x in dd])
-            result.append(np.append(x, fval))
-            for i in range(budget_per_random_walk - 1):
-                  cd = np.random.choice(range(dim))
-                  if not (x[cd] + signs[cd]*step_size[cd] <= bounds[cd][1] and x[cd] + signs[cd]*step_size[cd] >= bounds[cd][0]):
-                        signs[cd] = signs[cd] * -1
-                  x[cd] = x[cd] + signs[cd]*step_size[cd]
-                  fval = f(x)
-                  nfev += 1
-                  result.append(np.append(x, fval))
-      
-            result = np.array(result)
-            fvals = result[: , dim]
-            norm_fval = fvals.max() - fvals.min()
-            sp_range = sum([x[1] - x[0] for x in bounds])
-            denom = step_size.mean()/sp_range
-
-            g_t = []
-            for i in range(len(result) - 1):
-                  numer = (fvals[i + 1] - fvals[i]) / norm_fval
-                  g_t.append(numer/denom)
-
-            g_t = np.array(g_t)
-            g_avg = np.abs(g_t).sum()/len(g_t)
-            g_avgs.append(g_avg)
-
-            g_dev_num = sum([(g_avg - np.abs(g))**2 for g in g_t])
-            g_dev = np.sqrt(g_dev_num/(len(g_t) - 1))
-            g_devs.append(g_dev)
-      
-      g_avgs = np.array(g_avgs)
-      g_devs = np.array(g_devs)
+            coordinates = np.random.choice(dim, size = budget_per_random_walk - 1)
+            start = np.where(dd == 0, lower_bound, upper_bound).astype('float64')
+            signs = np.where(dd == 0, 1, -1)
+
+            moved = np.zeros((budget_per_random_walk, dim), dtype = bool)
+            values = np.zeros((budget_per_random_walk, dim))
+            moved[0] = True
+            values[0] = start
+            for cd in range(dim):
+                  steps = np.flatnonzero(coordinates == cd) + 1
+                  moved[steps, cd] = True
+                  values[steps, cd] = _reflected_walk(start[cd], signs[cd], step_size[cd], lower_bound[cd], upper_bound[cd], len(steps))
+            last_move = np.maximum.accumulate(np.where(moved, np.arange(budget_per_random_walk)[:, None], 0), axis = 0)
+            walks.append(values[last_move, np.arange(dim)])
+
+      walks = np.array(walks)
+      nfev = walks.shape[0] * walks.shape[1]
+      walk_fvals = f(walks.reshape(nfev, dim)).reshape(walks.shape[0], walks.shape[1])
+
+      norm_fval = walk_fvals.max(axis = 1) - walk_fvals.min(axis = 1)
+      sp_range = (upper_bound - lower_bound).sum()
+      denom = step_size.mean()/sp_range
+      g_t = np.diff(walk_fvals, axis = 1) / norm_fval[:, None] / denom
+      g_avgs = np.abs(g_t).sum(axis = 1)/g_t.shape[1]
+      g_devs = np.sqrt(((g_avgs[:, None] - np.abs(g_t)) ** 2).sum(axis = 1)/(g_t.shape[1] - 1))
 
       return {
             'gradient.g_avg': g_avgs.mean(),
@@ -98,39 +110,37 @@ def calculate_gradient(f, dim, lower_bound, upper_bound, step_size = None, budge
       }
 
 
-def calculate_fitness_distance_correlation(X, y, f_opt = None, proportion_of_best = 1, minimize = True, minkowski_p = 2):
+def calculate_fitness_distance_correlation(X, y, f_opt = None, proportion_of_best = 1, minimize = True, minkowski_p = 2, landscape_context = None):
       start_time = time.monotonic()
       if proportion_of_best > 1 or proportion_of_best <= 0:
             raise Exception('Proportion of the best samples must be in the interval (0, 1]')
-      if not type(y) is not pd.Series:
-            y = pd.Series(y)
-      else:
-            y = y.reset_index(drop = True)
+      landscape_context = _check_landscape_context(X, y, landscape_context)
+      X, y = landscape_context.X, landscape_context.y
       if not minimize:
             y = y * -1
       if f_opt is not None and not minimize:
             f_opt = -f_opt
       if f_opt is None:
-            fopt_idx = y.idxmin()
-      elif len(y[y == f_opt]) > 0:
-            fopt_idx = y[y == f_opt].index[0]
+            fopt_idx = np.argmin(y)
+      elif (y == f_opt).any():
+            fopt_idx = np.flatnonzero(y == f_opt)[0]
       else:
-            fopt_idx = y.idxmin()
+            fopt_idx = np.argmin(y)
 
       if proportion_of_best < 1:
-            sorted_idx = y.sort_values().index
+            sorted_idx = np.argsort(y)
             if round(len(sorted_idx)*proportion_of_best) < 2:
                   raise Exception(f'Selecting only {proportion_of_best} of the sample results in less than 2 remaining observations.')
             sorted_idx = sorted_idx[:round(len(sorted_idx)*proportion_of_best)]
-            X = X.iloc[sorted_idx].reset_index(drop = True)
-            y = y[sorted_idx].reset_index(drop = True)
+            X = X[sorted_idx]
+            y = y[sorted_idx]
 
-      dist = squareform(pdist(X, metric = 'minkowski', p = minkowski_p))[fopt_idx]
+      # Only the distances to the optimum are required
+      dist = cdist(X[[fopt_idx]], X, metric = 'minkowski', p = minkowski_p)[0]
       dist_mean = dist.mean()
       y_mean = y.mean()
 
-      cfd = np.array([(y[i] - y_mean)*(dist[i] - dist_mean) for i in range(len(y))])
-      cfd = cfd.sum()/len(y)
+      cfd = ((y - y_mean) * (dist - dist_mean)).sum()/len(y)
 
       rfd = cfd/(y.std(ddof = 1) * np.std(dist, ddof = 1))
 
@@ -144,63 +154,152 @@ def calculate_fitness_distance_correlation(X, y, f_opt = None, proportion_of_bes
             'fitness_distance.costs_runtime': timedelta(seconds=time.monotonic() - start_time).total_seconds()
       }
          
-def calculate_length_scales(f, dim, lower_bound, upper_bound, budget_factor_per_dim = 1000, seed = None, minimize = True, sample_size_from_kde = 500, use_kernel = False):
+# Ratios |f(x_i) - f(x_j)| / ||x_i - x_j|| of the pairs of walk (without NaNs, i.e., duplicated points with the same objective value)
+# in blocks of about chunk_size values. Without pairs, all pairs i < j are generated in the order of pdist, otherwise the given pairs.
+def _iterate_length_scale_blocks(walk, fvals, pairs = None, chunk_size = 2 ** 22):
+      n = walk.shape[0]
+      if pairs is None:
+            n_rows = max(1, chunk_size // n)
+            for start in range(0, n - 1, n_rows):
+                  rows = np.arange(start, min(start + n_rows, n - 1))
+                  upper = np.arange(n - start - 1)[None, :] >= (rows - start)[:, None]
+                  with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                        r = np.abs(fvals[rows, None] - fvals[None, start + 1:]) / cdist(walk[rows], walk[start + 1:])
+                  r = r[upper]
+                  yield r[~np.isnan(r)]
+      else:
+            first, second = pairs
+            for start in range(0, len(first), chunk_size):
+                  i = first[start:start + chunk_size]
+                  j = second[start:start + chunk_size]
+                  with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                        r = np.abs(fvals[i] - fvals[j]) / np.sqrt(((walk[i] - walk[j]) ** 2).sum(axis = 1))
+                  yield r[~np.isnan(r)]
+
+# Combines the number of values, the mean and the sums of the 2nd to 4th powers of the deviations from the mean of two sets of values
+# (pairwise update formulas of Pébay, 2008).
+def _combine_moments(a, b):
+      n_a, mean_a, m2_a, m3_a, m4_a = a
+      n_b, mean_b, m2_b, m3_b, m4_b = b
+      if n_a == 0:
+            return b
+      if n_b == 0:
+            return a
+      n = n_a + n_b
+      delta = mean_b - mean_a
+      mean = mean_a + delta * n_b / n
+      m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+      m3 = m3_a + m3_b + delta ** 3 * n_a * n_b * (n_a - n_b) / n ** 2 + 3 * delta * (n_a * m2_b - n_b * m2_a) / n
+      m4 = m4_a + m4_b + delta ** 4 * n_a * n_b * (n_a ** 2 - n_a * n_b + n_b ** 2) / n ** 3 + 6 * delta ** 2 * (n_a ** 2 * m2_b + n_b ** 2 * m2_a) / n ** 2 + 4 * delta * (n_a * m3_b - n_b * m3_a) / n
+
+      return n, mean, m2, m3, m4
+
+def _merge_value_counts(values, counts):
+      values, inverse = np.unique(np.concatenate(values), return_inverse = True)
+      return [values], [np.bincount(inverse, weights = np.concatenate(counts))]
+
+# The ratios of all pairs of walk points are processed in blocks, i.e., the moments are accumulated and the rounded ratios are counted
+# without keeping all ratios in memory. If max_pairs is given and the walk has more pairs, max_pairs pairs are sampled uniformly instead.
+def calculate_length_scales(f, dim, lower_bound, upper_bound, budget_factor_per_dim = 1000, seed = None, minimize = True, sample_size_from_kde = 500, use_kernel = False, vectorized = False, max_pairs = None):
       start_time = time.monotonic()
       lower_bound, upper_bound = _transform_bounds_to_canonical(dim, lower_bound, upper_bound)
+      f = _create_batch_function(f, vectorized = vectorized)
 
       if seed is not None:
             np.random.seed(seed)
-
-      bounds = list(zip(lower_bound, upper_bound))
+      if max_pairs is not None and max_pairs < 1:
+            raise Exception('"max_pairs" must be a positive integer.')
 
       x = np.random.uniform(lower_bound, upper_bound, dim)
-      result = []
-      nfev = 0
+      walk = []
       for _ in range(budget_factor_per_dim * (dim ** 2)):
-            x = _levy_random_walk(x)
-            x = np.array([np.clip(x[i], bounds[i][0], bounds[i][1]) for i in range(len(x))])
-            fval = f(x)
-            nfev += 1
-            result.append(np.append(x, fval))
-      result = np.array(result)
-      r_dist = pdist(result[:, :dim])
-      r_fval = pdist(result[:, dim].reshape(len(result), 1), metric = 'cityblock')
-      r = r_fval/r_dist
-      r = r[~np.isnan(r)]
+            x = np.clip(_levy_random_walk(x), lower_bound, upper_bound)
+            walk.append(x)
+      walk = np.array(walk)
+      fvals = f(walk)
+      nfev = len(fvals)
+
+      n = len(fvals)
+      pairs = None
+      if max_pairs is not None and max_pairs < n * (n - 1) // 2:
+            # Uniformly sampled pairs of different points
+            first = np.random.randint(0, n, size = max_pairs)
+            pairs = (first, (first + np.random.randint(1, n, size = max_pairs)) % n)
+
+      moments = (0, 0.0, 0.0, 0.0, 0.0)
+      r_min = np.inf
+      r_max = -np.inf
+      values = []
+      counts = []
+      n_values = 0
+      for r in _iterate_length_scale_blocks(walk, fvals, pairs = pairs):
+            if len(r) == 0:
+                  continue
+            mean = r.mean()
+            deviation = r - mean
+            deviation_2 = deviation ** 2
+            moments = _combine_moments(moments, (len(r), mean, deviation_2.sum(), (deviation_2 * deviation).sum(), (deviation_2 ** 2).sum()))
+            r_min = min(r_min, r.min())
+            r_max = max(r_max, r.max())
+            if not use_kernel:
+                  block_values, block_counts = np.unique(np.round(r, 6), return_counts = True)
+                  values.append(block_values)
+                  counts.append(block_counts)
+                  n_values += len(block_values)
+                  if len(values) > 1 and n_values > 2 * len(values[0]) + 2 ** 22:
+                        values, counts = _merge_value_counts(values, counts)
+                        n_values = len(values[0])
+      n_r, r_mean, m2, m3, m4 = moments
 
       if use_kernel:
-            kernel = gaussian_kde(r)
-            sample = np.random.uniform(low=r.min(), high=r.max(), size = sample_size_from_kde)
-            prob = kernel.pdf(sample)
+            # Gaussian KDE with Scott's rule (like gaussian_kde), its density is accumulated over the blocks of ratios
+            bandwidth = np.sqrt(m2 / (n_r - 1)) * n_r ** (-1 / 5)
+            sample = np.random.uniform(low = r_min, high = r_max, size = sample_size_from_kde)
+            prob = np.zeros(sample_size_from_kde)
+            for r in _iterate_length_scale_blocks(walk, fvals, pairs = pairs, chunk_size = 2 ** 22 // sample_size_from_kde):
+                  prob += np.exp(-0.5 * ((sample[:, None] - r[None, :]) / bandwidth) ** 2).sum(axis = 1)
             h_r = entropy(prob, base = 2)
       else:
-            h_r = entropy(pd.Series(np.round(r, 6)).value_counts())
+            h_r = entropy(_merge_value_counts(values, counts)[1][0])
       
-      moments = moment(r, moment = [2, 3, 4])
       return {
             'length_scale.shanon_entropy': h_r,
-            'length_scale.mean': np.mean(r),
-            'length_scale.std': np.std(r, ddof=1), 
-            'length_scale.distribution.second_moment': moments[0],
-            'length_scale.distribution.third_moment': moments[1],
-            'length_scale.distribution.fourth_moment': moments[2],
+            'length_scale.mean': r_mean,
+            'length_scale.std': np.sqrt(m2 / (n_r - 1)), 
+            'length_scale.distribution.second_moment': m2 / n_r,
+            'length_scale.distribution.third_moment': m3 / n_r,
+            'length_scale.distribution.fourth_moment': m4 / n_r,
             'length_scale.additional_function_eval': nfev,
             'length_scale.costs_runtime': timedelta(seconds=time.monotonic() - start_time).total_seconds()
       }
 
-def calculate_sobol_indices(f, dim, lower_bound, upper_bound, sampling_coefficient = 10000, n_bins = 20, min_obs_per_bin_factor = 1.5, seed = None):
+# Bin of each value for n_bins intervals of equal width, which are closed on the right (the same bins as pd.cut(y, n_bins))
+def _equal_width_bins(y, n_bins):
+      mn, mx = y.min() + 0.0, y.max() + 0.0
+      if mn == mx:
+            mn -= 0.001 * abs(mn) if mn != 0 else 0.001
+            mx += 0.001 * abs(mx) if mx != 0 else 0.001
+            bins = np.linspace(mn, mx, n_bins + 1, endpoint = True)
+      else:
+            bins = np.linspace(mn, mx, n_bins + 1, endpoint = True)
+            bins[0] -= (mx - mn) * 0.001
+
+      return np.searchsorted(bins, y, side = 'left') - 1
+
+def calculate_sobol_indices(f, dim, lower_bound, upper_bound, sampling_coefficient = 10000, n_bins = 20, min_obs_per_bin_factor = 1.5, seed = None, vectorized = False):
       start_time = time.monotonic()
       lower_bound, upper_bound = _transform_bounds_to_canonical(dim, lower_bound, upper_bound)
+      f = _create_batch_function(f, vectorized = vectorized)
       if seed is not None:
             np.random.seed(seed)
 
-      X = create_initial_sample(dim, n = sampling_coefficient * (dim + 2), lower_bound = lower_bound, upper_bound = upper_bound, sample_type = 'sobol')
-      y = X.apply(lambda x: f(x.values), axis = 1).values
+      X = create_initial_sample(dim, n = sampling_coefficient * (dim + 2), lower_bound = lower_bound, upper_bound = upper_bound, sample_type = 'sobol').to_numpy()
+      y = f(X)
 
       ## A. Metrics based on Sobol Indices
       pdef = {
             'num_vars': dim,
-            'names': X.columns,
+            'names': ['x' + str(x) for x in range(dim)],
             'bounds': list(zip(lower_bound, upper_bound))
       }
 
@@ -214,44 +313,37 @@ def calculate_sobol_indices(f, dim, lower_bound, upper_bound, sampling_coefficie
       mu_2 = y_hat.var()
 
       # 2. State Variance
-      full_sample = X.copy()
-      full_sample['y'] = y
-      full_sample = full_sample.sort_values('y')
-      full_sample['bins'] = pd.cut(full_sample.y, n_bins, labels= range(n_bins))
-
-      d_b_set = []
-      d_b_j_set = []
-      obs_per_bin = []
-      for bin in range(n_bins):
-            group = full_sample[full_sample.bins == bin]
-            obs_per_bin.append(group.shape[0])
-            if group.shape[0] < min_obs_per_bin_factor * dim:
-                  d_b_set.append(0)
-            else:
-                  grp_x = group.to_numpy()[:, :dim]
-                  x_mean = grp_x.mean(axis = 0)
-                  d_b_j = np.sqrt((grp_x - x_mean) ** 2).mean(axis = 1)
-                  d_b_j_set.append(d_b_j)
-                  d_b_set.append(d_b_j.mean())
-            
-      d_b_set = np.array(d_b_set)
-      d_b_j_set = np.hstack(np.array(d_b_j_set))
-      obs_per_bin = np.array(obs_per_bin)
-
-      d_distribution = np.hstack(np.array([np.array([d_b_set[i]] * obs_per_bin[i]) for i in range(n_bins)]))
-      u_2_d = d_distribution.var()
+      # After sorting by y, the bins are consecutive blocks of observations
+      order = np.argsort(y, kind = 'quicksort')
+      X_sorted = X[order]
+      obs_per_bin = np.bincount(_equal_width_bins(y, n_bins), minlength = n_bins)
+      large_bin = obs_per_bin >= min_obs_per_bin_factor * dim
+      in_large_bin = np.repeat(large_bin, obs_per_bin)
+      grp_x = X_sorted[in_large_bin]
+      grp_starts = np.concatenate([[0], np.cumsum(obs_per_bin[large_bin])[:-1]])
+
+      d_b_set = np.zeros(n_bins)
+      d_b_j_set = np.zeros(0)
+      if large_bin.any():
+            x_mean = np.add.reduceat(grp_x, grp_starts, axis = 0) / obs_per_bin[large_bin][:, None]
+            d_b_j_set = np.abs(grp_x - np.repeat(x_mean, obs_per_bin[large_bin], axis = 0)).mean(axis = 1)
+            d_b_set[large_bin] = np.add.reduceat(d_b_j_set, grp_starts) / obs_per_bin[large_bin]
+
+      # Variance of d_b_set[i] repeated obs_per_bin[i] times
+      d_mean = (obs_per_bin * d_b_set).sum() / obs_per_bin.sum()
+      u_2_d = (obs_per_bin * (d_b_set - d_mean) ** 2).sum() / obs_per_bin.sum()
 
       ## C. Fitness- and State Skewness
       # 1. Fitness Skewness
       norm_factor = np.abs((y.max() - y.min())/2)
       y_hat = ((y.max()- y.min())/2) + y.min()
-      fit_skewness =  np.array([(y_hat - y_i)/norm_factor for y_i in y]).mean()
+      fit_skewness = ((y_hat - y)/norm_factor).mean()
 
       # 2. State Skewness
       #d_caron = 0.5 - 0.5/n_bins
       norm_factor = np.abs((d_b_j_set.max() - d_b_j_set.min())/2)
       d_caron = (d_b_j_set.max() - d_b_j_set.min())/2 + d_b_j_set.min()
-      s_d = np.array([(d_caron - x)/norm_factor for x in d_b_j_set]).mean()
+      s_d = ((d_caron - d_b_j_set)/norm_factor).mean()
 
       return {
             'fla_metrics.sobol_indices.degree_of_variable_interaction': v_inter,
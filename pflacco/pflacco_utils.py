@@ -1,7 +1,16 @@
 import itertools
 import numpy as np
+import os
 import pandas as pd
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from scipy.optimize import minimize as scipy_minimize
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial.distance import cdist
+from sklearn.neighbors import NearestNeighbors
+
 #from rpy2.robjects.packages import importr, isinstalled
 
 #def _interface_mda():
@@ -23,22 +32,55 @@ def _cartesian_product_efficient(arrays):
             arr[..., i] = a
       return arr.reshape(-1, la)
 
+# The numerical core of the feature calculations works on float64 arrays. Data frames, series, lists and (read-only) memory maps are
+# converted without copying the data whenever their memory layout permits it.
 def _validate_variable_types(X, y):
-      if not isinstance(X, pd.DataFrame) and (isinstance(y, np.ndarray) or isinstance(y, list)):
-            X = pd.DataFrame(X)
-      elif not isinstance(X, pd.DataFrame):
+      if isinstance(X, pd.DataFrame):
+            X = X.to_numpy(dtype = 'float64')
+      elif isinstance(X, np.ndarray) or isinstance(X, list):
+            X = np.asarray(X, dtype = 'float64')
+      else:
             raise Exception('Unknown format of X. X must be either a Python list, numpy array oder pandas DataFrame')
+      if X.ndim != 2:
+            raise Exception('X must be two-dimensional, i.e., provide one observation per row.')
 
-      X.columns = ['x' + str(x) for x in range(X.shape[1])]
-      X = X.reset_index(drop = True)
-      if not isinstance(y, pd.Series) and (isinstance(y, np.ndarray) or isinstance(y, list)):
-            y = pd.Series(y, name = 'y')
-      y = y.reset_index(drop = True)
+      if isinstance(y, pd.Series):
+            y = y.to_numpy(dtype = 'float64')
+      elif isinstance(y, np.ndarray) or isinstance(y, list):
+            y = np.asarray(y, dtype = 'float64').reshape(-1)
+      else:
+            raise Exception('Unknown format of y. y must be either a Python list, numpy array oder pandas Series')
 
       if X.shape[0] != len(y):
-            raise Exception('pd.DataFrame X and pd.Series y must provide the same amount of observation.')
+            raise Exception('X and y must provide the same amount of observation.')
       return X, y
 
+# Helper functions for the evaluation of the objective function f. A vectorized f accepts an (n, d) array and returns n values.
+# Any other f is assumed to only accept a single observation and is adapted, such that all observations can be passed at once.
+# The returned functions are partials of module level functions, such that they can be passed to other processes (if f can be pickled).
+def _evaluate_vectorized(f, X):
+      X = np.atleast_2d(np.asarray(X, dtype = 'float64'))
+      return np.asarray(f(X), dtype = 'float64').reshape(X.shape[0])
+
+def _evaluate_rowwise(f, X):
+      X = np.atleast_2d(np.asarray(X, dtype = 'float64'))
+      return np.array([f(x) for x in X], dtype = 'float64')
+
+def _evaluate_single(batch_f, x):
+      return batch_f(x)[0]
+
+def _create_batch_function(f, vectorized = False):
+      if vectorized:
+            return partial(_evaluate_vectorized, f)
+      else:
+            return partial(_evaluate_rowwise, f)
+
+def _create_scalar_function(f, vectorized = False):
+      if not vectorized:
+            return f
+
+      return partial(_evaluate_single, _create_batch_function(f, vectorized = True))
+
 # Helper function to transform scalar bounds to an N * D array, where D is the dimensionality and N the different lower/upper bounds of the respective dimensions.
 def _transform_bounds_to_canonical(dim, lower_bound, upper_bound):
       if lower_bound is None or upper_bound is None:
@@ -76,28 +118,426 @@ def _check_blocks_variable(X, dim, blocks):
 
       return blocks
 
-def _create_blocks(X, y, lower_bound, upper_bound, blocks = None):
-      X, y, _validate_variable_types(X, y)
-      dim = X.shape[1]
-      blocks = _check_blocks_variable(X, dim, blocks)
-      lower_bound, upper_bound = _transform_bounds_to_canonical(dim, lower_bound, upper_bound)
+# Assignment of the observations in X to the cells of an equidistant grid. Cell ids follow the order of expand.grid in R, i.e., the first
+# dimension varies the fastest. The observations are additionally sorted by their cell (CSR-style): the members of the i-th occupied cell
+# self.cells[i] are self.order[self.offsets[i]:self.offsets[i + 1]]. Cell centers are only computed on request.
+class CellGrid:
+      def __init__(self, X, lower_bound, upper_bound, blocks = None):
+            X = np.asarray(X, dtype = 'float64')
+            dim = X.shape[1]
+            self.blocks = _check_blocks_variable(X, dim, blocks)
+            self.lower_bound, self.upper_bound = _transform_bounds_to_canonical(dim, lower_bound, upper_bound)
+            self.block_widths = (self.upper_bound - self.lower_bound) / self.blocks
+            self.dim_prod = np.cumprod(np.insert(self.blocks, 0, 1))[:-1]
+            self.n_cells = int(np.prod(self.blocks))
+            self.n_obs = X.shape[0]
+
+            coords = np.floor((X - self.lower_bound) / self.block_widths).astype('int64')
+            # Observations on the upper bound belong to the last cell of the respective dimension
+            coords -= (X == self.upper_bound)
+            self.cell_ids = coords @ self.dim_prod
+
+            self.order = np.argsort(self.cell_ids, kind = 'stable')
+            self.cells, counts = np.unique(self.cell_ids, return_counts = True)
+            self.offsets = np.insert(np.cumsum(counts), 0, 0)
+
+      @property
+      def dim(self):
+            return len(self.blocks)
+
+      @property
+      def counts(self):
+            return np.diff(self.offsets)
+
+      def cell_members(self, cell):
+            idx = np.searchsorted(self.cells, cell)
+            if idx == len(self.cells) or self.cells[idx] != cell:
+                  return np.array([], dtype = 'int64')
+            return self.order[self.offsets[idx]:self.offsets[idx + 1]]
+
+      # Zero based grid coordinates of the given cells (default: all cells of the grid)
+      def cell_coordinates(self, cells = None):
+            cells = np.arange(self.n_cells) if cells is None else np.asarray(cells, dtype = 'int64')
+            return (cells.reshape(-1, 1) // self.dim_prod) % self.blocks
+
+      def cell_centers(self, cells = None):
+            coords = self.cell_coordinates(cells)
+            centers = []
+            for idx in range(self.dim):
+                  tmp = np.linspace(self.lower_bound[idx], self.upper_bound[idx], self.blocks[idx] + 1)
+                  centers.append(((tmp[1:] + tmp[:-1])/2)[coords[:, idx]])
+            return np.column_stack(centers)
+
+      # Offsets from a cell to its successor along an axis (or a diagonal if diag = True)
+      def neighbour_offsets(self, diag = False):
+            if diag:
+                  combs = _cartesian_product_efficient([[-1, 0, 1]] * self.dim)
+                  return combs[(combs > 0).any(axis = 1)]
+            return np.identity(self.dim, dtype = 'int64')
+
+      # Triples [predecessor, cell, successor] of all cells of the grid, where the successor is the neighbouring cell along an axis (or a
+      # diagonal if diag = True) and the predecessor is derived from the cell ids. Cells which are located in a corner of the grid are never
+      # the center of a triple. In the diagonal mode, the cells of each triple are sorted and duplicated triples are removed.
+      def neighbour_triples(self, diag = False):
+            combs = self.neighbour_offsets(diag)
+            cells = np.arange(self.n_cells)
+            coords = self.cell_coordinates(cells)
+            inner = ~((coords == 0) | (coords == self.blocks - 1)).all(axis = 1)
+            cells, coords = cells[inner], coords[inner]
+
+            # Offsets are processed in chunks to bound the memory of the (cells x offsets x dim) array
+            nbs = []
+            chunk_size = max(1, 2 ** 20 // max(1, len(cells) * self.dim))
+            for start in range(0, len(combs), chunk_size):
+                  z = coords[:, None, :] + combs[None, start:start + chunk_size, :]
+                  valid = ((z >= 0) & (z < self.blocks)).all(axis = 2)
+                  succ = z @ self.dim_prod
+                  pred = 2 * cells[:, None] - succ
+                  valid &= (pred >= 0) & (pred < self.n_cells)
+                  nbs.append(np.column_stack([pred[valid], np.broadcast_to(cells[:, None], valid.shape)[valid], succ[valid]]))
+            nbs = np.vstack(nbs) if len(nbs) > 0 else np.empty((0, 3), dtype = 'int64')
+            if diag:
+                  nbs = np.unique(np.sort(nbs, axis = 1), axis = 0)
+
+            return nbs
+
+      # The triples of neighbour_triples which contain at least one occupied cell, without enumerating the cells of the grid. Every occupied
+      # cell proposes the centers of the triples, in which it is the center, the successor or the predecessor (for each offset). The proposed
+      # centers are then checked like in the dense enumeration. The cost is proportional to the number of occupied cells times the number
+      # of offsets. In the diagonal mode, the cells of each triple are sorted and duplicated triples are removed.
+      def occupied_neighbour_triples(self, diag = False):
+            combs = self.neighbour_offsets(diag)
+            n_combs = len(combs)
+            comb_ids = combs @ self.dim_prod
+            occupied_coords = self.cell_coordinates(self.cells)
+
+            nbs = []
+            chunk_size = max(1, 2 ** 20 // max(1, len(self.cells) * self.dim))
+            for start in range(0, n_combs, chunk_size):
+                  k = np.arange(start, min(start + chunk_size, n_combs))
+                  pred_coords = occupied_coords[:, None, :] - combs[None, k, :]
+                  as_succ = np.where(((pred_coords >= 0) & (pred_coords < self.blocks)).all(axis = 2), pred_coords @ self.dim_prod, -1)
+                  as_center = np.broadcast_to(self.cells[:, None], as_succ.shape)
+                  as_pred = self.cells[:, None] + comb_ids[None, k]
+                  centers = np.stack([as_center, as_succ, as_pred])
+                  valid = (centers >= 0) & (centers < self.n_cells)
+                  pairs = np.unique(centers[valid] * n_combs + np.broadcast_to(k, centers.shape)[valid])
+                  cells, offsets = pairs // n_combs, combs[pairs % n_combs]
+
+                  coords = self.cell_coordinates(cells)
+                  z = coords + offsets
+                  valid = ((z >= 0) & (z < self.blocks)).all(axis = 1) & ~((coords == 0) | (coords == self.blocks - 1)).all(axis = 1)
+                  succ = z @ self.dim_prod
+                  pred = 2 * cells - succ
+                  valid &= (pred >= 0) & (pred < self.n_cells)
+                  nbs.append(np.column_stack([pred, cells, succ])[valid])
+            nbs = np.vstack(nbs) if len(nbs) > 0 else np.empty((0, 3), dtype = 'int64')
+            if diag:
+                  nbs = np.unique(np.sort(nbs, axis = 1), axis = 0)
+
+            return nbs
+
+def _check_cell_grid(X, lower_bound, upper_bound, blocks = None, cell_grid = None):
+      if cell_grid is None:
+            return CellGrid(X, lower_bound, upper_bound, blocks)
+      if not isinstance(cell_grid, CellGrid):
+            raise Exception('"cell_grid" must be an instance of CellGrid.')
+      if X.shape[0] != cell_grid.n_obs or X.shape[1] != cell_grid.dim:
+            raise Exception('The provided cell grid was not created for the provided sample X.')
+
+      return cell_grid
+
+# Validated sample which is shared by several feature calculations. The spatial index and the k nearest neighbours (computed once for the
+# largest k requested so far) are only computed when a feature set requests them.
+class LandscapeContext:
+      def __init__(self, X, y):
+            self.X, self.y = _validate_variable_types(X, y)
+            self._spatial_index = None
+            self._knn_distances = None
+            self._knn_indices = None
+
+      @property
+      def n_obs(self):
+            return self.X.shape[0]
+
+      @property
+      def dim(self):
+            return self.X.shape[1]
+
+      @property
+      def spatial_index(self):
+            if self._spatial_index is None:
+                  self._spatial_index = NearestNeighbors(algorithm = 'kd_tree').fit(self.X)
+            return self._spatial_index
+
+      # Distances and indices of the k nearest observations of every observation (including the observation itself)
+      def kneighbors(self, k):
+            k = min(k, self.n_obs)
+            if self._knn_indices is None or self._knn_indices.shape[1] < k:
+                  self._knn_distances, self._knn_indices = self.spatial_index.kneighbors(self.X, n_neighbors = k)
+            return self._knn_distances[:, :k], self._knn_indices[:, :k]
+
+      # Distances and indices of the k nearest observations of arbitrary points
+      def query(self, points, k = 1):
+            return self.spatial_index.kneighbors(np.atleast_2d(points), n_neighbors = min(k, self.n_obs))
+
+def _check_landscape_context(X, y, landscape_context = None):
+      if landscape_context is None:
+            return LandscapeContext(X, y)
+      if not isinstance(landscape_context, LandscapeContext):
+            raise Exception('"landscape_context" must be an instance of LandscapeContext.')
+      X, y = _validate_variable_types(X, y)
+      if not (np.array_equal(X, landscape_context.X, equal_nan = True) and np.array_equal(y, landscape_context.y, equal_nan = True)):
+            raise Exception('The provided landscape context was not created for the provided sample X and y.')
+
+      return landscape_context
+
+def _check_backend(backend):
+      if backend not in ['thread', 'process']:
+            raise Exception('Unknown backend. Please use either "thread" or "process".')
+
+# Number of workers for n_jobs, where n_jobs = None runs sequentially and n_jobs = -1 uses all available cores
+def _check_n_jobs(n_jobs, backend = 'thread'):
+      if n_jobs is None:
+            n_jobs = 1
+      elif n_jobs == -1:
+            n_jobs = os.cpu_count() or 1
+      if not isinstance(n_jobs, (int, np.integer)) or n_jobs < 1:
+            raise Exception('"n_jobs" must be None, a positive integer or -1.')
+      _check_backend(backend)
+      return n_jobs
+
+# Root of the independent random streams of parallel runs. Without a seed, it is drawn from the global random state, such that
+# np.random.seed makes parallel runs reproducible as well.
+def _create_seed_sequence(seed = None):
+      if seed is None:
+            seed = int(np.random.randint(0, 2 ** 32, dtype = np.uint64))
+      return np.random.SeedSequence(seed)
+
+def _create_executor(n_jobs, backend = 'thread'):
+      if backend == 'thread':
+            return ThreadPoolExecutor(max_workers = n_jobs)
+      return ProcessPoolExecutor(max_workers = n_jobs)
+
+# Applies func to all items and returns the results in the order of the items, independent of the number of workers and the order in which
+# they finish. With backend = 'process', func and the items have to be picklable.
+def _parallel_map(func, items, n_jobs = None, backend = 'thread'):
+      items = list(items)
+      n_jobs = min(_check_n_jobs(n_jobs, backend), len(items))
+      if n_jobs <= 1:
+            return [func(x) for x in items]
+
+      with _create_executor(n_jobs, backend) as executor:
+            if backend == 'thread':
+                  return list(executor.map(func, items))
+            return list(executor.map(func, items, chunksize = max(1, len(items) // (4 * n_jobs))))
+
+# Edges of a minimum spanning tree of the points in X w.r.t. the euclidean distance (Prim's algorithm with O(n) memory).
+# Returns the end points and the weights of the n - 1 edges, the weights are the merge heights of a single linkage clustering.
+def _minimum_spanning_tree(X):
+      n = X.shape[0]
+      in_tree = np.zeros(n, dtype = bool)
+      dist = np.full(n, np.inf)
+      parent = np.zeros(n, dtype = int)
+      edges = np.zeros((max(n - 1, 0), 2), dtype = int)
+      weights = np.zeros(max(n - 1, 0))
+      current = 0
+      for i in range(n - 1):
+            in_tree[current] = True
+            d = cdist(X[[current]], X)[0]
+            closer = (d < dist) & ~in_tree
+            dist[closer] = d[closer]
+            parent[closer] = current
+            current = np.argmin(np.where(in_tree, np.inf, dist))
+            edges[i] = parent[current], current
+            weights[i] = dist[current]
+
+      return edges, weights
+
+# Flat clusters of a single linkage clustering cut at the given height, i.e., connected components of the minimum spanning tree of X
+# after removing all edges which are not shorter than height. Clusters are labelled in the order of their first observation (like cut_tree).
+def _single_linkage_clusters(X, edges, weights, height):
+      n = X.shape[0]
+      keep = weights < height
+      graph = coo_matrix((np.ones(keep.sum()), (edges[keep, 0], edges[keep, 1])), shape = (n, n))
+      _, labels = connected_components(graph, directed = False)
+      _, first, inverse = np.unique(labels, return_index = True, return_inverse = True)
+      rank = np.empty(len(first), dtype = int)
+      rank[np.argsort(first)] = np.arange(len(first))
+
+      return rank[inverse]
+
+def _negate_function(f, x):
+      return -1 * f(x)
+
+# Grid hash of points for the search of duplicates, keyed on all coordinates. The cells have the width bucket_factor * threshold, such that
+# a point is only close to the border of its cell (less than threshold) in a few dimensions. The cells of all points with a Chebyshev
+# distance below threshold are the ones of coord +- threshold, i.e., only the adjacent cells in these few dimensions have to be checked.
+# The cells are centered on the multiples of their width, such that round coordinates (e.g., optima on the bounds) are not on a border.
+class _NodeIndex:
+      def __init__(self, threshold = 1e-5, bucket_factor = 100):
+            self.threshold = threshold
+            self.width = bucket_factor * threshold
+            self.buckets = {}
+            self.coords = []
+
+      def __len__(self):
+            return len(self.coords)
+
+      def _key(self, coord):
+            return tuple(int(k) for k in np.floor(coord / self.width + 0.5))
+
+      def add(self, coord):
+            coord = np.array(coord, dtype = float)
+            self.buckets.setdefault(self._key(coord), []).append(len(self.coords))
+            self.coords.append(coord)
+
+      # checks whether coord is in the neighbourhood of any point and returns the first (oldest) one
+      def find(self, coord):
+            coord = np.asarray(coord, dtype = float)
+            keys = zip(self._key(coord - self.threshold), self._key(coord + self.threshold))
+            candidates = []
+            for key in itertools.product(*[range(low, high + 1) for low, high in keys]):
+                  candidates.extend(self.buckets.get(key, []))
+            for i in sorted(candidates):
+                  if (np.abs(self.coords[i] - coord) < self.threshold).all():
+                        return True, i
+
+            return False, -1
+
+# Optima found by the local searches on one problem, which can be shared by calculate_hill_climbing, calculate_ela_local and compute_lon.
+# Every distinct optimum is stored once per settings (method and further arguments of minimize) with the start, objective value and number
+# of function evaluations of the first search which found it. Optima closer than tolerance (in every coordinate) are considered the same.
+# A store is bound to the objective function, bounds and direction of the optimization of its first use.
+# The local searches of hill climbing and ela_local are terminated as soon as an iterate lies within the tolerance of an optimum, which was
+# stored by a search with the same settings. The stored search is then the result of the search. With reuse_across_settings = True, the
+# optima of searches with any settings are reused, i.e., the results are no longer those of a run of the search with its own settings.
+class LocalSearchStore:
+      def __init__(self, tolerance = 1e-3, reuse_across_settings = False):
+            self.tolerance = tolerance
+            self.reuse_across_settings = reuse_across_settings
+            self.starts = []
+            self.optima = []
+            self.fvals = []
+            self.nfevs = []
+            self.settings = []
+            self._indices = {}
+            self.f = None
+            self.problem = None
+
+      def __len__(self):
+            return len(self.optima)
+
+      # The objective function is only required to validate the problem and is not passed to other processes
+      def __getstate__(self):
+            return dict(self.__dict__, f = None)
+
+      @staticmethod
+      def settings_key(method, **minimizer_kwargs):
+            return repr((method, sorted(minimizer_kwargs.items())))
+
+      def bind(self, f, lower_bound, upper_bound, minimize = True):
+            problem = (np.asarray(lower_bound, dtype = 'float64').tolist(), np.asarray(upper_bound, dtype = 'float64').tolist(), bool(minimize))
+            if self.problem is None:
+                  self.f, self.problem = f, problem
+            elif self.f is not f or self.problem != problem:
+                  raise Exception('The local search store was created for a different problem (objective function, bounds or direction of the optimization).')
+
+      # Grid hash of the optima which can be reused by searches with the given settings and the positions of its optima in the store
+      def _index(self, settings):
+            return self._indices.get(None if self.reuse_across_settings else settings)
+
+      # Adds the optimum of a search unless it is already stored (for its settings) and returns its position
+      def add(self, start, optimum, fval, nfev, settings):
+            key = None if self.reuse_across_settings else settings
+            if key not in self._indices:
+                  self._indices[key] = (_NodeIndex(threshold = self.tolerance), [])
+            index, positions = self._indices[key]
+            duplicate, i = index.find(optimum)
+            if duplicate:
+                  return positions[i]
+
+            index.add(optimum)
+            positions.append(len(self))
+            self.starts.append(np.array(start, dtype = 'float64'))
+            self.optima.append(np.array(optimum, dtype = 'float64'))
+            self.fvals.append(float(fval))
+            self.nfevs.append(int(nfev))
+            self.settings.append(settings)
+            return positions[-1]
+
+      # Position of the stored optimum within the tolerance of x, which can be reused by a search with the given settings (None if there is none)
+      def query(self, x, settings):
+            index = self._index(settings)
+            if index is None:
+                  return None
+            duplicate, i = index[0].find(x)
+            return index[1][i] if duplicate else None
+
+      def result(self, position):
+            return self.optima[position], self.fvals[position], self.nfevs[position]
+
+      # Start, optimum, objective value, number of function evaluations and settings of all stored searches
+      def records(self):
+            return list(zip(self.starts, self.optima, self.fvals, self.nfevs, self.settings))
+
+def _check_local_search_store(local_search_store, f, lower_bound, upper_bound, minimize = True):
+      if local_search_store is None:
+            return None
+      if not isinstance(local_search_store, LocalSearchStore):
+            raise Exception('"local_search_store" must be an instance of LocalSearchStore.')
+      local_search_store.bind(f, lower_bound, upper_bound, minimize)
+
+      return local_search_store
+
+class _StoredOptimumReached(Exception):
+      def __init__(self, position):
+            self.position = position
+
+class _CountingFunction:
+      def __init__(self, f):
+            self.f = f
+            self.nfev = 0
+
+      def __call__(self, x):
+            self.nfev += 1
+            return self.f(x)
+
+# Returns the optimum, its objective value and the number of function evaluations of the search which yields it (the local search itself or
+# a reused stored search), the number of fresh evaluations and the number of reused evaluations of a local search. With a local_search_store,
+# the search is terminated as soon as its start or an iterate lies within the tolerance of an optimum stored with the same settings.
+def _run_local_search(f, method, bounds, minimizer_kwargs, local_search_store, settings, x0):
+      if local_search_store is None:
+            opt_result = scipy_minimize(f, x0, method = method, bounds = bounds, **minimizer_kwargs)
+            return opt_result.x, opt_result.fun, opt_result.nfev, opt_result.nfev, 0
 
-      block_widths = (upper_bound - lower_bound)/blocks
-      cp = np.cumprod(np.insert(blocks, 0, 1))
+      def callback(xk, *args):
+            position = local_search_store.query(xk, settings)
+            if position is not None:
+                  raise _StoredOptimumReached(position)
 
-      cell_ids = []
-      for idx, row in X.iterrows():
-            cid = [cp[ndim] * np.floor((row[ndim] - lower_bound[ndim]) / block_widths[ndim]) for ndim in range(X.shape[1])]
-            cell_ids.append((cid - cp[:-1] * (row == upper_bound)).sum()) 
-      cell_ids = np.array(cell_ids)
+      counted_f = _CountingFunction(f)
+      try:
+            callback(x0)
+            opt_result = scipy_minimize(counted_f, x0, method = method, bounds = bounds, callback = callback, **minimizer_kwargs)
+      except _StoredOptimumReached as e:
+            x, fun, nfev = local_search_store.result(e.position)
+            return x, fun, nfev, counted_f.nfev, nfev
 
+      return opt_result.x, opt_result.fun, opt_result.nfev, opt_result.nfev, 0
 
-      n_centers = []
-      for idx in range(len(blocks)):
-            tmp = np.linspace(lower_bound[idx], upper_bound[idx], blocks[idx] + 1)
-            n_centers.append((tmp[1:] + tmp[:-1])/2)
-      # Artificial complicated sorting to replicate output from expand.grid in R
-      c_centers = pd.DataFrame(np.array([x for x in itertools.product(*[y for y in n_centers])]))
-      c_centers = c_centers.sort_values(list(reversed(c_centers.columns))).to_numpy()
+# Runs the local searches from all starts and adds their optima to the store. All searches only see the optima stored before, hence the
+# results do not depend on the number of workers. Returns the optimum, its objective value and the number of function evaluations of the
+# search which yields it for every start in their order, the total number of fresh evaluations (i.e., evaluations spent by this call,
+# including those of terminated searches) and the total number of evaluations of the reused stored searches.
+def _run_stored_local_searches(f, method, bounds, minimizer_kwargs, starts, local_search_store = None, settings = None, n_jobs = None, backend = 'thread'):
+      local_search = partial(_run_local_search, f, method, bounds, minimizer_kwargs, local_search_store, settings)
+      results = _parallel_map(local_search, starts, n_jobs = n_jobs, backend = backend)
+      if local_search_store is not None:
+            for x0, (x, fun, nfev, _, reused_nfev) in zip(starts, results):
+                  if reused_nfev == 0:
+                        local_search_store.add(x0, x, fun, nfev, settings)
 
-      return cell_ids, c_centers
+      fresh_nfev = sum(result[3] for result in results)
+      reused_nfev = sum(result[4] for result in results)
+      return [(x, fun, nfev) for x, fun, nfev, _, _ in results], fresh_nfev, reused_nfev
@@ -1,12 +1,12 @@
 import numpy as np
 import pandas as pd
 
+from functools import partial
 from pyDOE import lhs
 from SALib.sample import sobol_sequence
 from scipy.stats import levy
-from scipy.optimize import minimize as scipy_minimize
 
-from .pflacco_utils import _transform_bounds_to_canonical
+from .pflacco_utils import _transform_bounds_to_canonical, _create_batch_function, _create_scalar_function, _negate_function, _check_backend, _create_seed_sequence, _run_stored_local_searches, _check_local_search_store, LocalSearchStore
 
 def create_initial_sample(dim, n = None, sample_coefficient = 50, lower_bound = 0, upper_bound = 1, sample_type = 'lhs'):
       if sample_type not in ['lhs', 'random', 'sobol']:
@@ -43,14 +43,23 @@ def create_initial_sample(dim, n = None, sample_coefficient = 50, lower_bound =
       
       return pd.DataFrame(X, columns = colnames)
 
+def evaluate_sample(f, X, vectorized = False):
+      y = _create_batch_function(f, vectorized = vectorized)(X)
 
+      return pd.Series(y, name = 'y')
 
-def _create_local_search_sample(f, dim, lower_bound, upper_bound, n_runs = 100, budget_factor_per_run=1000, method = 'L-BFGS-B', minimize = True, seed = None, x0 = None):
+
+# With n_jobs = None, the starting points are drawn from the global random state. Otherwise, every run draws its starting point from its own
+# stream (a child of the SeedSequence of seed, or of a seed drawn from the global random state) and the runs are distributed over n_jobs
+# workers. The result is then the same for any n_jobs.
+def _create_local_search_sample(f, dim, lower_bound, upper_bound, n_runs = 100, budget_factor_per_run=1000, method = 'L-BFGS-B', minimize = True, seed = None, x0 = None, vectorized = False, local_search_store = None, n_jobs = None, backend = 'thread'):
+    _check_backend(backend)
     lower_bound, upper_bound = _transform_bounds_to_canonical(dim, lower_bound, upper_bound)
+    local_search_store = _check_local_search_store(local_search_store, f, lower_bound, upper_bound, minimize)
+    f = _create_scalar_function(f, vectorized = vectorized)
 
     if not minimize:
-        original_f = f
-        f = lambda x: -1 * original_f(x)
+        f = partial(_negate_function, f)
     if seed is not None:
         np.random.seed(seed)
 
@@ -60,15 +69,16 @@ def _create_local_search_sample(f, dim, lower_bound, upper_bound, n_runs = 100,
         
     }
     bounds = list(zip(lower_bound, upper_bound))
-    result = []
-    nfval = 0
-    for _ in range(n_runs):
-        x0 = np.random.uniform(low = lower_bound, high = upper_bound, size = dim)
-        opt_result = scipy_minimize(f, x0, method = method, bounds = bounds, options = minimizer_kwargs)
-        result.append(np.append(opt_result.x, [opt_result.fun]))
-        nfval += opt_result.nfev
-
-    return np.array(result), nfval
+    if n_jobs is None:
+        # The same numbers as drawing one starting point per run
+        starts = np.random.uniform(low = lower_bound, high = upper_bound, size = (n_runs, dim))
+    else:
+        starts = np.array([np.random.default_rng(seed_sequence).uniform(low = lower_bound, high = upper_bound) for seed_sequence in _create_seed_sequence(seed).spawn(n_runs)]).reshape(n_runs, dim)
+    settings = LocalSearchStore.settings_key(method, options = minimizer_kwargs)
+    results, nfval, reused_nfval = _run_stored_local_searches(f, method, bounds, {'options': minimizer_kwargs}, starts, local_search_store, settings, n_jobs = n_jobs, backend = backend)
+    result = [np.append(x, [fun]) for x, fun, _ in results]
+
+    return np.array(result), nfval, reused_nfval
 
 
 def _levy_random_walk(x, loc = 0, scale = 10**-3):
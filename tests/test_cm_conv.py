@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+import warnings
+
+from pflacco.classical_ela_features import calculate_cm_conv
+
+
+def _features(result):
+    return {k: v for k, v in result.items() if 'runtime' not in k}
+
+
+@pytest.mark.parametrize('diag', [False, True])
+def test_sparse_with_dense_fallback_matches_dense(diag):
+    rng = np.random.default_rng(3)
+    X = rng.uniform(-5, 5, size=(40, 3))
+    y = (X ** 2).sum(axis=1) + np.sin(5 * X).sum(axis=1)
+
+    dense = calculate_cm_conv(X, y, -5, 5, blocks=4, cm_conv_diag=diag)
+    sparse = calculate_cm_conv(X, y, -5, 5, blocks=4, cm_conv_diag=diag, cm_conv_sparse=True, cm_conv_max_dense_size=2 ** 20)
+
+    assert _features(sparse) == _features(dense)
+
+
+@pytest.mark.parametrize('diag', [False, True])
+def test_sparse_matches_dense_if_empty_cells_are_enclosed(diag):
+    # Only the cells with two odd coordinates are empty, hence every triple contains an occupied cell and the nearest observations of
+    # the empty cells lie in the occupied cells of their triples
+    rng = np.random.default_rng(4)
+    coords = np.array([[i, j] for i in range(5) for j in range(5) if i % 2 == 0 or j % 2 == 0])
+    X = -5 + 2 * (coords[rng.integers(0, len(coords), size=60)] + rng.uniform(0.1, 0.9, size=(60, 2)))
+    y = (X ** 2).sum(axis=1)
+
+    dense = calculate_cm_conv(X, y, -5, 5, blocks=5, cm_conv_diag=diag)
+    sparse = calculate_cm_conv(X, y, -5, 5, blocks=5, cm_conv_diag=diag, cm_conv_sparse=True)
+
+    assert _features(sparse) == _features(dense)
+
+
+def test_sparse_on_nearly_empty_grid_is_defined():
+    rng = np.random.default_rng(1)
+    X = rng.uniform(-5, 5, size=(3, 3))
+    y = X.sum(axis=1)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', RuntimeWarning)
+        result = calculate_cm_conv(X, y, -5, 5, blocks=5, cm_conv_sparse=True)
+
+    assert not np.isnan(list(_features(result).values())).any()
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from pflacco.classical_ela_features import calculate_nbc
+from pflacco.pflacco_utils import LandscapeContext
+
+
+def test_context_of_another_sample_is_rejected():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(-5, 5, size=(50, 2))
+    y = (X ** 2).sum(axis=1)
+    other_X = rng.uniform(-5, 5, size=(50, 2))
+
+    with pytest.raises(Exception, match='not created for the provided sample'):
+        calculate_nbc(X, y, landscape_context=LandscapeContext(other_X, (other_X ** 2).sum(axis=1)))
+    with pytest.raises(Exception, match='not created for the provided sample'):
+        calculate_nbc(X, y, landscape_context=LandscapeContext(X, y + 1))
+
+
+def test_context_of_the_same_sample_gives_the_same_features():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(-5, 5, size=(50, 2))
+    y = (X ** 2).sum(axis=1)
+
+    with_context = calculate_nbc(X, y, landscape_context=LandscapeContext(X, y))
+    without_context = calculate_nbc(X, y)
+    assert {k: v for k, v in with_context.items() if 'runtime' not in k} == {k: v for k, v in without_context.items() if 'runtime' not in k}
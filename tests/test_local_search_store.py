@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from pflacco.classical_ela_features import calculate_ela_local
+from pflacco.misc_features import calculate_hill_climbing
+from pflacco.pflacco_utils import LocalSearchStore, _NodeIndex
+
+
+def rastrigin(x):
+    x = np.asarray(x)
+    return float(10 * len(x) + np.sum(x ** 2 - 10 * np.cos(2 * np.pi * x)))
+
+
+def test_hill_climbing_reuses_stored_optima():
+    store = LocalSearchStore()
+    first = calculate_hill_climbing(rastrigin, 3, -5, 5, n_runs=30, budget_factor_per_run=50, seed=5, local_search_store=store)
+    assert first['hill_climbing.reused_function_eval'] == 0
+    assert len(store) > 0
+
+    second = calculate_hill_climbing(rastrigin, 3, -5, 5, n_runs=30, budget_factor_per_run=50, seed=6, local_search_store=store)
+    fresh = calculate_hill_climbing(rastrigin, 3, -5, 5, n_runs=30, budget_factor_per_run=50, seed=6)
+    assert second['hill_climbing.reused_function_eval'] > 0
+    assert second['hill_climbing.additional_function_eval'] < fresh['hill_climbing.additional_function_eval']
+
+
+def test_optima_of_other_settings_are_only_reused_on_request():
+    rng = np.random.default_rng(1)
+    X = rng.uniform(-5, 5, size=(300, 3))
+    y = np.array([rastrigin(x) for x in X])
+    fresh = calculate_ela_local(X, y, rastrigin, 3, -5, 5, ela_local_local_searches_factor=20, seed=2)
+
+    store = LocalSearchStore()
+    calculate_hill_climbing(rastrigin, 3, -5, 5, n_runs=50, budget_factor_per_run=50, seed=5, local_search_store=store)
+    result = calculate_ela_local(X, y, rastrigin, 3, -5, 5, ela_local_local_searches_factor=20, seed=2, local_search_store=store)
+    assert {k: v for k, v in result.items() if 'runtime' not in k} == dict({k: v for k, v in fresh.items() if 'runtime' not in k}, **{'ela_local.reused_function_eval': 0})
+
+    store = LocalSearchStore(reuse_across_settings=True)
+    calculate_hill_climbing(rastrigin, 3, -5, 5, n_runs=50, budget_factor_per_run=50, seed=5, local_search_store=store)
+    result = calculate_ela_local(X, y, rastrigin, 3, -5, 5, ela_local_local_searches_factor=20, seed=2, local_search_store=store)
+    assert result['ela_local.reused_function_eval'] > 0
+    assert result['ela_local.additional_function_eval'] < fresh['ela_local.additional_function_eval']
+
+
+def test_store_is_bound_to_one_problem():
+    store = LocalSearchStore()
+    calculate_hill_climbing(rastrigin, 2, -5, 5, n_runs=5, budget_factor_per_run=20, seed=1, local_search_store=store)
+
+    with pytest.raises(Exception, match='different problem'):
+        calculate_hill_climbing(lambda x: rastrigin(x) + 1, 2, -5, 5, n_runs=5, budget_factor_per_run=20, seed=1, local_search_store=store)
+    with pytest.raises(Exception, match='different problem'):
+        calculate_hill_climbing(rastrigin, 2, -4, 4, n_runs=5, budget_factor_per_run=20, seed=1, local_search_store=store)
+
+
+def test_node_index_is_keyed_on_all_coordinates():
+    index = _NodeIndex(threshold=1e-3)
+    points = np.zeros((50, 6))
+    points[:, 5] = np.linspace(-5, 5, 50)
+    for point in points:
+        index.add(point)
+
+    assert len(index.buckets) == len(points)
+    assert index.find(points[20] + 9e-4) == (True, 20)
+    assert index.find(points[20] + np.array([0, 0, 0, 0, 0, 2e-3])) == (False, -1)
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from pflacco.local_optima_network_features import compute_lon
+from pflacco.misc_features import calculate_hill_climbing
+from pflacco.pflacco_utils import LocalSearchStore
+
+
+def rastrigin(x):
+    x = np.asarray(x)
+    return float(10 * len(x) + np.sum(x ** 2 - 10 * np.cos(2 * np.pi * x)))
+
+
+def _lon(n_restarts, **kwargs):
+    result = compute_lon(rastrigin, 2, -5, 5, f_opt=0, stepsize=1, basin_hopping_iteration=n_restarts, stopping_threshold=10, random_seed=3, **kwargs)
+    return {k: v for k, v in result.items() if 'runtime' not in k}
+
+
+@pytest.mark.parametrize('n_jobs', [None, 2])
+def test_extended_checkpoint_matches_uninterrupted_run(tmp_path, n_jobs):
+    checkpoint_file = str(tmp_path / 'lon.npz')
+    _lon(3, n_jobs=n_jobs, checkpoint_file=checkpoint_file, checkpoint_interval=2)
+
+    assert _lon(6, n_jobs=n_jobs, checkpoint_file=checkpoint_file, checkpoint_interval=2) == _lon(6, n_jobs=n_jobs)
+
+
+@pytest.mark.parametrize('n_jobs', [None, 2])
+def test_checkpoint_restores_local_search_store(tmp_path, n_jobs):
+    checkpoint_file = str(tmp_path / 'lon.npz')
+    _lon(3, n_jobs=n_jobs, checkpoint_file=checkpoint_file, local_search_store=LocalSearchStore(reuse_across_settings=True))
+
+    stores = [LocalSearchStore(reuse_across_settings=True) for _ in range(3)]
+    _lon(6, n_jobs=n_jobs, local_search_store=stores[0])
+    # resumed from three restarts and restored from the finished run
+    _lon(6, n_jobs=n_jobs, checkpoint_file=checkpoint_file, local_search_store=stores[1])
+    _lon(6, n_jobs=n_jobs, checkpoint_file=checkpoint_file, local_search_store=stores[2])
+
+    results = []
+    for store in stores:
+        result = calculate_hill_climbing(rastrigin, 2, -5, 5, n_runs=20, budget_factor_per_run=50, seed=5, local_search_store=store)
+        results.append(({k: v for k, v in result.items() if 'runtime' not in k}, len(store)))
+    assert results[0][0]['hill_climbing.reused_function_eval'] > 0
+    assert results[1] == results[0] and results[2] == results[0]
+
+
+def test_checkpoint_without_records_is_rejected_for_store(tmp_path):
+    checkpoint_file = str(tmp_path / 'lon.npz')
+    _lon(2, checkpoint_file=checkpoint_file)
+
+    with pytest.raises(Exception, match='without a local_search_store'):
+        _lon(4, checkpoint_file=checkpoint_file, local_search_store=LocalSearchStore())
+
+
+def test_checkpoint_with_different_settings_is_rejected(tmp_path):
+    checkpoint_file = str(tmp_path / 'lon.npz')
+    _lon(2, checkpoint_file=checkpoint_file)
+
+    with pytest.raises(Exception, match='different settings'):
+        compute_lon(rastrigin, 2, -5, 5, stepsize=2, basin_hopping_iteration=4, stopping_threshold=10, random_seed=3, checkpoint_file=checkpoint_file)
+    with pytest.raises(Exception, match='different settings'):
+        compute_lon(rastrigin, 2, -5, 5, stepsize=1, basin_hopping_iteration=4, stopping_threshold=10, random_seed=4, checkpoint_file=checkpoint_file)
+
+
+def test_checkpoint_with_more_restarts_is_rejected(tmp_path):
+    checkpoint_file = str(tmp_path / 'lon.npz')
+    _lon(4, checkpoint_file=checkpoint_file)
+
+    with pytest.raises(Exception, match='more than basin_hopping_iteration'):
+        _lon(2, checkpoint_file=checkpoint_file)
+
+
+def test_checkpoint_of_other_function_with_same_name_is_rejected(tmp_path):
+    checkpoint_file = str(tmp_path / 'lon.npz')
+    _lon(2, checkpoint_file=checkpoint_file)
+
+    shifted = lambda x: rastrigin(np.asarray(x) - 0.5)
+    other = lambda x: rastrigin(x)
+    shifted.__qualname__ = other.__qualname__ = rastrigin.__qualname__
+    with pytest.raises(Exception, match='different settings'):
+        compute_lon(shifted, 2, -5, 5, stepsize=1, basin_hopping_iteration=4, stopping_threshold=10, random_seed=3, checkpoint_file=checkpoint_file)
+    compute_lon(other, 2, -5, 5, stepsize=1, basin_hopping_iteration=4, stopping_threshold=10, random_seed=3, checkpoint_file=checkpoint_file)
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from pflacco.classical_ela_features import calculate_ela_local
+from pflacco.local_optima_network_features import compute_lon
+from pflacco.misc_features import calculate_hill_climbing
+
+
+def sphere_vectorized(X):
+    return ((np.asarray(X) - 0.5) ** 2).sum(axis=1)
+
+
+def _without_runtime(result):
+    return {k: v for k, v in result.items() if 'runtime' not in k}
+
+
+def test_ela_local_process_backend_with_vectorized_f():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(-5, 5, size=(100, 2))
+    y = sphere_vectorized(X)
+
+    serial = calculate_ela_local(X, y, sphere_vectorized, 2, -5, 5, ela_local_local_searches_factor=10, seed=1, vectorized=True)
+    parallel = calculate_ela_local(X, y, sphere_vectorized, 2, -5, 5, ela_local_local_searches_factor=10, seed=1, vectorized=True, n_jobs=2, backend='process')
+    assert _without_runtime(parallel) == _without_runtime(serial)
+
+
+def test_ela_local_process_backend_when_maximizing():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(-5, 5, size=(100, 2))
+    y = -sphere_vectorized(X)
+
+    serial = calculate_ela_local(X, y, sphere_vectorized, 2, -5, 5, minimize=False, ela_local_local_searches_factor=10, seed=1, vectorized=True)
+    parallel = calculate_ela_local(X, y, sphere_vectorized, 2, -5, 5, minimize=False, ela_local_local_searches_factor=10, seed=1, vectorized=True, n_jobs=2, backend='process')
+    assert _without_runtime(parallel) == _without_runtime(serial)
+
+
+def test_hill_climbing_process_backend_with_vectorized_f():
+    thread = calculate_hill_climbing(sphere_vectorized, 2, -5, 5, n_runs=8, budget_factor_per_run=20, seed=1, vectorized=True, n_jobs=2)
+    process = calculate_hill_climbing(sphere_vectorized, 2, -5, 5, n_runs=8, budget_factor_per_run=20, seed=1, vectorized=True, n_jobs=2, backend='process')
+    assert _without_runtime(process) == _without_runtime(thread)
+
+
+def test_lon_process_backend_with_vectorized_f():
+    thread = compute_lon(sphere_vectorized, 2, -5, 5, basin_hopping_iteration=4, stopping_threshold=5, random_seed=1, vectorized=True, n_jobs=2)
+    process = compute_lon(sphere_vectorized, 2, -5, 5, basin_hopping_iteration=4, stopping_threshold=5, random_seed=1, vectorized=True, n_jobs=2, backend='process')
+    assert _without_runtime(process) == _without_runtime(thread)
+
+
+def test_parallel_hill_climbing_follows_global_seed():
+    results = []
+    for n_jobs in [1, 2, 2]:
+        np.random.seed(11)
+        results.append(_without_runtime(calculate_hill_climbing(sphere_vectorized, 2, -5, 5, n_runs=6, budget_factor_per_run=20, vectorized=True, n_jobs=n_jobs)))
+    np.random.seed(12)
+    other = _without_runtime(calculate_hill_climbing(sphere_vectorized, 2, -5, 5, n_runs=6, budget_factor_per_run=20, vectorized=True, n_jobs=2))
+
+    assert results[0] == results[1] == results[2]
+    assert other != results[0]
+
+
+def test_unknown_backend_is_rejected_without_n_jobs():
+    X = np.random.default_rng(0).uniform(-5, 5, size=(40, 2))
+    with pytest.raises(Exception, match='Unknown backend'):
+        calculate_ela_local(X, sphere_vectorized(X), sphere_vectorized, 2, -5, 5, ela_local_local_searches_factor=10, vectorized=True, backend='proces')
+    with pytest.raises(Exception, match='Unknown backend'):
+        calculate_hill_climbing(sphere_vectorized, 2, -5, 5, n_runs=2, vectorized=True, backend='proces')
+    with pytest.raises(Exception, match='Unknown backend'):
+        compute_lon(sphere_vectorized, 2, -5, 5, basin_hopping_iteration=2, vectorized=True, backend='proces')